@@ -0,0 +1,236 @@
+"""Base class of dependency tree generators of all ecosystems."""
+
+import os
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from f8a_utils.dependency_graph import DependencyGraph, SharedNodeTable
+from f8a_utils.result_writer import write_result
+from f8a_utils.tree_expansion import ExpansionBudget, intern_records
+
+# Total size of manifests (in bytes) below which they are never scanned in parallel.
+PARALLEL_SCAN_THRESHOLD = 1024 * 1024
+
+# Maximal number of parsed coordinate strings cached per ecosystem.
+COORDINATES_CACHE_SIZE = 2 ** 16
+
+
+class DependencyTreeGenerator(ABC):
+    """Abstract class for Dependency Finderq."""
+
+    ecosystem = None
+
+    def __init__(self, graph_class=DependencyGraph):
+        """Init method for DependencyTreeGenerator class.
+
+        :param graph_class: graph implementation used to resolve transitive deps,
+                            DependencyGraph or CSRDependencyGraph for very large trees
+        """
+        self.graph_class = graph_class
+
+    def get_dependencies(self, manifests, show_transitive, compact=False, workers=None,
+                         parallel_threshold=PARALLEL_SCAN_THRESHOLD, cache=None, lazy=False,
+                         timeout=None, shared_nodes=False, sink=None, **options):
+        """Make Ecosystem Tree.
+
+        :param manifests: list of manifests
+        :param show_transitive: bool, resolve transitive dependencies
+        :param compact: bool, emit details of every manifest only once, see `_build_result`
+        :param workers: int, number of worker processes to scan the manifests with
+        :param parallel_threshold: int, total size of manifests in bytes below which
+                                   they are scanned in this process anyway
+        :param cache: TreeCache, reuse dependencies resolved for the same content before
+        :param sink: file-like or socket-like object to write the result to as JSON, details
+                     of every manifest are written as soon as it's scanned, in the compact
+                     layout of the result; see `result_writer.write_result`
+        :param lazy: bool, return transitive deps as LazyDependencies resolved on first access;
+                     such results are scanned in this process and not stored in the cache
+        :param timeout: float, seconds after which no more transitive deps are reported
+        :param shared_nodes: bool, return dependency graphs of all the manifests in one table
+                             of shared nodes instead of transitive deps, see
+                             `_get_shared_dependencies`; scanned in this process, not cached
+                             and not combinable with timeout and options
+        :param options: options passed to `_scan_manifest`, `reverse_index=True` adds
+                        `_reverse_index` of transitive deps to the details of every manifest,
+                        `max_nodes` and `max_depth` limit transitive deps of every manifest;
+                        others are ecosystem specific
+        :return: dict with the results, details of manifests cut by a limit (or the timeout)
+                 have `truncated` set, they are not stored in the cache; `lazy` is ignored
+                 with the reverse index and limits; number of manifests written with `sink`
+        """
+        if shared_nodes and show_transitive:
+            if options or timeout is not None:
+                raise ValueError('Shared nodes can not be combined with {}'.format(
+                    ', '.join(sorted(options) + (['timeout'] if timeout is not None else []))))
+            result = self._get_shared_dependencies(manifests)
+            if sink is not None:
+                entry = result['result'][0]
+                return write_result(entry['details'], sink, {"nodes": entry['nodes']})
+            return result
+
+        details = self._iter_details(manifests, show_transitive, workers, parallel_threshold,
+                                     cache, lazy, timeout, options)
+        if sink is not None:
+            return write_result(details, sink)
+        return self._build_result(list(details), compact)
+
+    def _iter_details(self, manifests, show_transitive, workers, parallel_threshold, cache,
+                      lazy, timeout, options):
+        """Scan the manifests, yield their details in order of the manifests.
+
+        Details of manifests found in the cache are yielded right away, others as soon
+        as they are scanned; scanned details are stored in the cache, see `get_dependencies`.
+        """
+        keys, details = self._get_cached_details(manifests, show_transitive, cache, options)
+        pending_manifests = [manifest for manifest, dep in zip(manifests, details) if dep is None]
+        lazy = lazy and not options.get('reverse_index') and timeout is None and \
+            options.get('max_nodes') is None and options.get('max_depth') is None
+        scan = partial(self._scan_manifest, show_transitive=show_transitive, **options)
+        if timeout is not None:
+            scan = partial(scan, deadline=time.time() + timeout)
+        if lazy:
+            scan = partial(scan, lazy=True)
+            workers = None
+        executor, scanned = self._start_scan(scan, pending_manifests, workers, parallel_threshold)
+        try:
+            for i, manifest in enumerate(manifests):
+                dep = details[i]
+                if dep is None:
+                    dep = next(scanned)
+                    if keys[i] is not None and not lazy:
+                        self._store_details(cache, keys[i], manifest, dep)
+                else:
+                    # Don't keep details already yielded.
+                    details[i] = None
+                yield dep
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    def _get_cached_details(self, manifests, show_transitive, cache, options):
+        """Look the manifests up in the cache.
+
+        :return: tuple (list of cache keys, list of cached details), None for manifests
+                 without a key (no cache, file objects) or not found in the cache
+        """
+        keys = [None] * len(manifests)
+        details = [None] * len(manifests)
+        if cache is None:
+            return keys, details
+        for i, manifest in enumerate(manifests):
+            keys[i] = cache.make_key(self.ecosystem, show_transitive, manifest['content'],
+                                     options)
+            cached = cache.get(keys[i]) if keys[i] is not None else None
+            if cached is not None:
+                details[i] = self._new_details(manifest)
+                details[i].update(cached)
+        return keys, details
+
+    def _store_details(self, cache, key, manifest, dep):
+        """Store details of a scanned manifest in the cache, unless they were truncated."""
+        if dep.get('truncated'):
+            return
+        manifest_fields = self._new_details(manifest)
+        cache.set(key, {field: value for field, value in dep.items()
+                        if field not in manifest_fields})
+
+    def _start_scan(self, scan, manifests, workers, parallel_threshold):
+        """Start scanning the manifests, in worker processes if they are worth it.
+
+        :return: tuple (executor to shut down or None, iterator of the details in order
+                 of the manifests)
+        """
+        if self._should_scan_in_parallel(manifests, workers, parallel_threshold):
+            executor = ProcessPoolExecutor(max_workers=workers)
+            # map() keeps the order of manifests.
+            return executor, executor.map(scan, manifests)
+        return None, (scan(manifest) for manifest in manifests)
+
+    def _get_shared_dependencies(self, manifests):
+        """Resolve dependency graphs of the manifests into one table of shared nodes.
+
+        The only result entry has `nodes`, list of dependency records with `deps` holding
+        indices of their direct dependencies in the list. Records of direct deps in the
+        details of the manifests have `node`, index of their node, instead of `deps`.
+        Nodes with equal records and equal dependencies are stored once for all the
+        manifests, so the result grows with unique packages rather than with edges.
+        Use `expand_shared_nodes` to get transitive deps back.
+        """
+        table = SharedNodeTable()
+        details = []
+        for manifest in manifests:
+            dep = self._new_details(manifest)
+            roots, children, to_record = self._get_node_graph(manifest)
+            resolved = []
+            for root, node_id in zip(roots, table.add(roots, children, to_record)):
+                record = to_record(root)
+                record['node'] = node_id
+                resolved.append(record)
+            dep['_resolved'] = resolved
+            details.append(dep)
+        return {"result": [{"details": details, "nodes": table.nodes}]}
+
+    def _get_node_graph(self, manifest):
+        """Get dependency graph of single manifest.
+
+        :return: tuple (list of direct dependency nodes, callable returning dependencies
+                 of a node, callable returning record of a node)
+        """
+        raise NotImplementedError()
+
+    @staticmethod
+    def _should_scan_in_parallel(manifests, workers, parallel_threshold):
+        """Check if manifests are worth sending to worker processes."""
+        if not workers or workers < 2 or len(manifests) < 2:
+            return False
+        total_size = 0
+        for manifest in manifests:
+            content = manifest['content']
+            if isinstance(content, (str, bytes, bytearray)):
+                total_size += len(content)
+            elif isinstance(content, os.PathLike):
+                total_size += os.path.getsize(content)
+            else:
+                # File objects can't be passed to other processes.
+                return False
+        return total_size >= parallel_threshold
+
+    @abstractmethod
+    def _scan_manifest(self, manifest, show_transitive, **options):
+        """Scan single manifest, return its details.
+
+        :param options: `lazy`, `reverse_index`, `max_nodes`, `max_depth`, `deadline`
+                        and ecosystem specific options, see `get_dependencies`
+        """
+
+    @staticmethod
+    def _new_budget(max_nodes=None, max_depth=None, deadline=None):
+        """Create budget of transitive expansion, None if there are no limits."""
+        if max_nodes is None and max_depth is None and deadline is None:
+            return None
+        return ExpansionBudget(max_nodes, max_depth, deadline)
+
+    def _new_details(self, manifest):
+        """Create details of a manifest without resolved dependencies."""
+        return {
+            "ecosystem": self.ecosystem,
+            "manifest_file_path": manifest['filepath'],
+            "manifest_file": manifest['filename']
+        }
+
+    def _build_result(self, details, compact=False):
+        """Wrap details of all the manifests into the result.
+
+        Legacy result has one {"details": details} entry per manifest, all of them
+        referencing the same list of all the details. Compact result has just one
+        such entry and equal dependency records share one dict instance.
+        """
+        if compact:
+            return {"result": [{"details": intern_records(details)}]}
+        return {"result": [{"details": details} for _ in details]}
+
+    @staticmethod
+    def _parse_transitives(*args):                # noqa
+        """func. for calculating transitives."""
+        pass
@@ -0,0 +1,368 @@
+"""Bounded caches with pluggable in-memory and on-disk backends."""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Bump when the format of cached values changes, old entries are ignored then.
+_TREE_CACHE_VERSION = 2
+
+# Size of chunks manifest files are hashed by.
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+# Bump when the format of cached versions changes, old entries are ignored then.
+_VERSION_CACHE_VERSION = 1
+
+# Seconds cached versions of packages are used without asking the registry again.
+_VERSION_CACHE_TTL = {
+    'npm': 15 * 60,
+    'pypi': 15 * 60,
+    'maven': 60 * 60,
+    'golang': 60 * 60,
+}
+_DEFAULT_VERSION_CACHE_TTL = 15 * 60
+
+# Seconds a hit in the sqlite cache leaves the access time of the entry as it is,
+# so hits are read-only and do not queue for the write lock of the database.
+_SQLITE_ACCESS_INTERVAL = 60
+
+
+class MemoryCacheBackend:
+    """In-memory LRU backend bounded by total size of keys and values in bytes."""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        """Init method for MemoryCacheBackend class."""
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return value stored under the key or None."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Store value (bytes) under the key, evict least recently used entries."""
+        size = len(key) + len(value)
+        with self._lock:
+            self._delete(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = value
+            self.size_bytes += size
+            while self.size_bytes > self.max_bytes:
+                old_key, old_value = self._entries.popitem(last=False)
+                self.size_bytes -= len(old_key) + len(old_value)
+
+    def delete(self, key):
+        """Remove the key from the cache."""
+        with self._lock:
+            self._delete(key)
+
+    def clear(self):
+        """Remove all the entries."""
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def __len__(self):
+        """Return number of cached entries."""
+        return len(self._entries)
+
+    def _delete(self, key):
+        value = self._entries.pop(key, None)
+        if value is not None:
+            self.size_bytes -= len(key) + len(value)
+
+
+class SqliteCacheBackend:
+    """On-disk LRU backend bounded by total size of values in bytes.
+
+    The database runs in WAL mode, so one file can be shared by many threads
+    and processes on the node. Every thread and process opens its own connection.
+    Total size of the entries is kept up to date by triggers in a metadata row.
+    Access times are refreshed at most once per `access_interval` seconds, so the
+    order of eviction is least recently used up to that interval.
+    """
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024, timeout=30,
+                 access_interval=_SQLITE_ACCESS_INTERVAL):
+        """Init method for SqliteCacheBackend class."""
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.access_interval = access_interval
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('CREATE TABLE IF NOT EXISTS cache ('
+                         'key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+                         'size INTEGER NOT NULL, accessed REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)')
+            conn.execute('CREATE TABLE IF NOT EXISTS cache_meta ('
+                         'name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+            conn.execute("INSERT OR IGNORE INTO cache_meta (name, value) "
+                         "SELECT 'size', CAST(TOTAL(size) AS INTEGER) FROM cache")
+            conn.execute("CREATE TRIGGER IF NOT EXISTS cache_size_insert AFTER INSERT ON cache "
+                         "BEGIN UPDATE cache_meta SET value = value + NEW.size "
+                         "WHERE name = 'size'; END")
+            conn.execute("CREATE TRIGGER IF NOT EXISTS cache_size_delete AFTER DELETE ON cache "
+                         "BEGIN UPDATE cache_meta SET value = value - OLD.size "
+                         "WHERE name = 'size'; END")
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def __getstate__(self):
+        """Do not pickle connections, they are opened again in the other process."""
+        state = self.__dict__.copy()
+        del state['_local']
+        return state
+
+    def __setstate__(self, state):
+        """Restore the backend in the other process."""
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def _connection(self):
+        """Return connection of this thread, connections are not inherited by forks."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        """Return value stored under the key or None."""
+        conn = self._connection()
+        row = conn.execute('SELECT value, accessed FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if row[1] < now - self.access_interval:
+            conn.execute('UPDATE cache SET accessed = ? WHERE key = ?', (now, key))
+        return bytes(row[0])
+
+    def set(self, key, value):
+        """Store value (bytes) under the key, evict least recently used entries."""
+        size = len(key) + len(value)
+        if size > self.max_bytes:
+            return
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # REPLACE does not fire delete triggers, the old entry is deleted explicitly.
+            conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+            conn.execute('INSERT INTO cache (key, value, size, accessed) VALUES (?, ?, ?, ?)',
+                         (key, sqlite3.Binary(value), size, time.time()))
+            excess = self._size_bytes(conn) - self.max_bytes
+            if excess > 0:
+                evicted = []
+                for old_key, old_size in conn.execute(
+                        'SELECT key, size FROM cache WHERE key != ? ORDER BY accessed', (key,)):
+                    evicted.append((old_key,))
+                    excess -= old_size
+                    if excess <= 0:
+                        break
+                conn.executemany('DELETE FROM cache WHERE key = ?', evicted)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def delete(self, key):
+        """Remove the key from the cache."""
+        self._connection().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def clear(self):
+        """Remove all the entries."""
+        self._connection().execute('DELETE FROM cache')
+
+    @property
+    def size_bytes(self):
+        """Return total size of cached entries."""
+        return self._size_bytes(self._connection())
+
+    @staticmethod
+    def _size_bytes(conn):
+        return conn.execute("SELECT value FROM cache_meta WHERE name = 'size'").fetchone()[0]
+
+    def __len__(self):
+        """Return number of cached entries."""
+        return self._connection().execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+
+class TreeCache:
+    """Content-addressed cache of resolved dependency trees.
+
+    Trees are keyed on ecosystem, show_transitive, scan options and SHA-256 of
+    the manifest content, so the same manifest is parsed only once, whatever its
+    file name or path is.
+    """
+
+    def __init__(self, backend=None):
+        """Init method for TreeCache class.
+
+        :param backend: MemoryCacheBackend (default), SqliteCacheBackend or compatible
+        """
+        self.backend = backend if backend is not None else MemoryCacheBackend()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(ecosystem, show_transitive, content, options=None):
+        """Compute cache key of a manifest.
+
+        :param ecosystem: Ecosystem
+        :param show_transitive: bool, transitive dependencies resolved
+        :param content: manifest content (str, bytes or path)
+        :param options: dict, other options the tree depends on
+        :return: str key, None if the content can't be hashed (file objects)
+        """
+        digest = hashlib.sha256()
+        if isinstance(content, str):
+            digest.update(content.encode('utf-8'))
+        elif isinstance(content, (bytes, bytearray)):
+            digest.update(content)
+        elif isinstance(content, os.PathLike):
+            with open(content, 'rb') as fd:
+                for chunk in iter(lambda: fd.read(_HASH_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+        else:
+            return None
+        return '{v}:{e}:{t}:{o}:{h}'.format(
+            v=_TREE_CACHE_VERSION, e=ecosystem, t=int(bool(show_transitive)),
+            o=json.dumps(options or {}, sort_keys=True, default=str), h=digest.hexdigest())
+
+    def get(self, key):
+        """Return cached details of a manifest (without file name and path) or None."""
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(value.decode('utf-8'))
+
+    def set(self, key, details):
+        """Cache details of a manifest."""
+        self.backend.set(key, json.dumps(details, separators=(',', ':')).encode('utf-8'))
+
+    def stats(self):
+        """Return cache statistics."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(self.backend),
+            'size_bytes': self.backend.size_bytes,
+        }
+
+
+class VersionCache:
+    """Cache of versions of packages looked up in package registries.
+
+    Entries hold the versions and the latest version of a package with the ETag and
+    Last-Modified validators of the registry response. Entries older than the time to
+    live of their ecosystem are stale, they are revalidated with the registry rather
+    than downloaded again, see `f8a_utils.versions.set_version_cache`.
+
+    With SqliteCacheBackend the cache is shared by all the processes on the node and
+    survives their restarts. Failures of the backend (e.g. the database locked for too
+    long) are logged and handled as cache misses, they never fail the lookups.
+    """
+
+    def __init__(self, backend=None, ttl=None):
+        """Init method for VersionCache class.
+
+        :param backend: MemoryCacheBackend (default, bounded to 32 MiB), SqliteCacheBackend
+                        or compatible
+        :param ttl: dict, seconds entries are fresh for by ecosystem, overrides defaults
+        """
+        self.backend = backend if backend is not None else MemoryCacheBackend(32 * 1024 * 1024)
+        self.ttl = dict(_VERSION_CACHE_TTL, **(ttl or {}))
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+    @staticmethod
+    def make_key(ecosystem, package_name, options=None):
+        """Compute cache key of a package.
+
+        :param ecosystem: Ecosystem
+        :param package_name: str, package name
+        :param options: dict, other options the versions depend on
+        :return: str key
+        """
+        return '{v}:{e}:{o}:{p}'.format(
+            v=_VERSION_CACHE_VERSION, e=ecosystem,
+            o=json.dumps(options or {}, sort_keys=True), p=package_name)
+
+    def get(self, key):
+        """Return cached entry or None.
+
+        :return: dict with `value`, `etag`, `last_modified` and `stored` (timestamp)
+        """
+        try:
+            value = self.backend.get(key)
+        except sqlite3.Error as e:
+            logger.warning('Unable to read cached versions: %s', e)
+            value = None
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(value.decode('utf-8'))
+
+    def set(self, key, value, etag=None, last_modified=None):
+        """Cache versions of a package with validators of the registry response."""
+        entry = {'value': value, 'etag': etag, 'last_modified': last_modified,
+                 'stored': time.time()}
+        try:
+            self.backend.set(key, json.dumps(entry, separators=(',', ':')).encode('utf-8'))
+        except sqlite3.Error as e:
+            logger.warning('Unable to cache versions: %s', e)
+
+    def revalidated(self, key, entry):
+        """Mark the entry fresh again, the registry confirmed it has not changed."""
+        self.revalidations += 1
+        self.set(key, entry['value'], entry['etag'], entry['last_modified'])
+
+    def is_fresh(self, ecosystem, entry):
+        """Check if the entry can be used without asking the registry."""
+        return time.time() - entry['stored'] < self.ttl.get(ecosystem, _DEFAULT_VERSION_CACHE_TTL)
+
+    @staticmethod
+    def conditional_headers(entry):
+        """Return headers of request asking the registry if the entry has changed."""
+        headers = {}
+        if entry is not None:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def stats(self):
+        """Return cache statistics."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'revalidations': self.revalidations,
+            'entries': len(self.backend),
+            'size_bytes': self.backend.size_bytes,
+        }
@@ -1,10 +1,37 @@
 """Definition of a class to find dependencies from an input manifest file."""
 
-from f8a_utils.tree_generator import \
-    MavenDependencyTreeGenerator as MvnTree, \
-    NpmDependencyTreeGenerator as NpmTree, \
-    PypiDependencyTreeGenerator as PyTree, \
-    GolangDependencyTreeGenerator as GoTree
+import importlib
+import threading
+from collections import defaultdict
+
+from f8a_utils.cache_utils import TreeCache
+
+# Tree generators of the ecosystems, "module:class" ones are imported on first use.
+_ECOSYSTEMS = {
+    "npm": "f8a_utils.npm_tree_generator:NpmDependencyTreeGenerator",
+    "maven": "f8a_utils.maven_tree_generator:MavenDependencyTreeGenerator",
+    "pypi": "f8a_utils.pypi_tree_generator:PypiDependencyTreeGenerator",
+    "golang": "f8a_utils.golang_tree_generator:GolangDependencyTreeGenerator",
+}
+_generator_classes = {}
+_generators = {}
+_registry_lock = threading.Lock()
+
+# Trees diffed without a cache of the caller, shared so revisions are parsed once per process.
+_diff_cache = TreeCache()
+
+
+def register_ecosystem(eco, generator):
+    """Register tree generator of an ecosystem, replacing the current one.
+
+    :param eco: Ecosystem
+    :param generator: DependencyTreeGenerator subclass or "module:class" string
+                      of one, imported when the ecosystem is used for the first time
+    """
+    with _registry_lock:
+        _ECOSYSTEMS[eco] = generator
+        _generator_classes.pop(eco, None)
+        _generators.pop(eco, None)
 
 
 def get_dependency_tree_generator(eco):
@@ -13,29 +40,167 @@ def get_dependency_tree_generator(eco):
     :param eco: Ecosystem
     :return: func. to execute.
     """
-    func_dict = {
-        "npm": NpmTree,
-        "maven": MvnTree,
-        "pypi": PyTree,
-        "golang": GoTree,
-    }
-    assert eco in func_dict, "Ecosystem not supported."
-    return func_dict.get(eco)
+    generator_class = _generator_classes.get(eco)
+    if generator_class is None:
+        with _registry_lock:
+            generator = _ECOSYSTEMS.get(eco)
+            assert generator is not None, "Ecosystem not supported."
+            if isinstance(generator, str):
+                module, _, name = generator.partition(':')
+                generator = getattr(importlib.import_module(module), name)
+            generator_class = _generator_classes[eco] = generator
+    return generator_class
+
+
+def get_tree_generator(eco):
+    """Get shared instance of the tree generator of the ecosystem.
+
+    Generators keep no state between calls, so one instance (with its warmed up
+    caches) serves all the scans of the ecosystem.
+
+    :param eco: Ecosystem
+    :return: DependencyTreeGenerator instance
+    """
+    generator = _generators.get(eco)
+    if generator is None:
+        generator_class = get_dependency_tree_generator(eco)
+        with _registry_lock:
+            generator = _generators.setdefault(eco, generator_class())
+    return generator
+
+
+def _index_dependencies(resolved):
+    """Index resolved dependencies of a manifest.
+
+    :param resolved: list of resolved direct dependencies with their deps
+    :return: tuple of dicts (direct, transitive) mapping package to set of versions
+    """
+    direct = defaultdict(set)
+    transitive = defaultdict(set)
+    for dependency in resolved:
+        direct[dependency['package']].add(dependency['version'])
+        for dep in dependency.get('deps') or []:
+            transitive[dep['package']].add(dep['version'])
+    return direct, transitive
+
+
+def _diff_index(previous, current):
+    """Compare two package -> versions indexes.
+
+    :return: dict with added, removed and changed packages
+    """
+    diff = {"added": [], "removed": [], "changed": []}
+    for package in sorted(current.keys() - previous.keys()):
+        diff["added"].extend({"package": package, "version": version}
+                             for version in sorted(current[package]))
+    for package in sorted(previous.keys() - current.keys()):
+        diff["removed"].extend({"package": package, "version": version}
+                               for version in sorted(previous[package]))
+    for package in sorted(previous.keys() & current.keys()):
+        if previous[package] != current[package]:
+            diff["changed"].append({
+                "package": package,
+                "previous_versions": sorted(previous[package]),
+                "versions": sorted(current[package])
+            })
+    return diff
 
 
 class DependencyFinder():
     """Implementation of methods to find dependencies from manifest file."""
 
     @staticmethod
-    def scan_and_find_dependencies(ecosystem, manifests, show_transitive):
-        """Scan the dependencies files to fetch transitive deps."""
+    def scan_and_find_dependencies(ecosystem, manifests, show_transitive, compact=False,
+                                   workers=None, parallel_threshold=None,
+                                   cache=None, lazy=False, reverse_index=False, max_nodes=None,
+                                   max_depth=None, timeout=None, shared_nodes=False, sink=None,
+                                   **options):
+        """Scan the dependencies files to fetch transitive deps.
+
+        :param ecosystem: Ecosystem
+        :param manifests: list of manifests (dicts with filename, filepath and content)
+        :param show_transitive: bool or "true"/"false", resolve transitive dependencies
+        :param compact: bool, return details of every manifest only once, in a single
+                        result entry, with equal dependency records shared
+        :param workers: int, scan manifests in a pool of that many processes
+        :param parallel_threshold: int, total size of manifests in bytes below which
+                                   they are scanned in this process anyway, defaults to
+                                   `base_tree_generator.PARALLEL_SCAN_THRESHOLD`
+        :param cache: f8a_utils.cache_utils.TreeCache, reuse trees of already seen manifests
+        :param lazy: bool, resolve transitive deps on first access of the "deps" sequence
+        :param reverse_index: bool, add `_reverse_index` to the details of every manifest,
+                              mapping transitive package and version to the direct deps
+                              pulling it in and the paths from them
+        :param max_nodes: int, maximal number of transitive deps of a manifest
+        :param max_depth: int, maximal depth of transitive deps
+        :param timeout: float, seconds after which no more transitive deps are reported
+        :param shared_nodes: bool, return one table of dependency nodes shared by all the
+                             manifests, with direct deps of the manifests referencing their
+                             nodes; see `tree_expansion.expand_shared_nodes`
+        :param sink: file-like (with `write`) or socket-like (with `sendall`) object, write
+                     the result to it as JSON manifest by manifest instead of returning it
+        :param options: ecosystem specific options of the tree generator, e.g. `mvs=True`
+                        for golang or `dedup=True` for npm
+        :return: dict with the results, details of manifests cut by a limit have
+                 `truncated` set; number of manifests written when `sink` is given
+        """
+        if type(show_transitive) is not bool:
+            show_transitive = show_transitive == "true"
+        # Unset options are left out, so they don't change keys of the tree cache.
+        if reverse_index:
+            options['reverse_index'] = True
+        if max_nodes is not None:
+            options['max_nodes'] = max_nodes
+        if max_depth is not None:
+            options['max_depth'] = max_depth
+        if parallel_threshold is not None:
+            options['parallel_threshold'] = parallel_threshold
+        return get_tree_generator(ecosystem).get_dependencies(
+            manifests, show_transitive, compact=compact, workers=workers, cache=cache,
+            lazy=lazy, timeout=timeout, shared_nodes=shared_nodes, sink=sink, **options)
+
+    @staticmethod
+    def diff_dependencies(ecosystem, previous, current, show_transitive=True, cache=None):
+        """Find dependencies changed between two revisions of a manifest.
+
+        Both revisions are resolved through the tree cache, so a revision scanned
+        before (typically the previous one) is not parsed again. When the content
+        has not changed at all, nothing is parsed.
+
+        :param ecosystem: Ecosystem
+        :param previous: previous revision of the manifest (filename, filepath, content)
+        :param current: current revision of the manifest
+        :param show_transitive: bool, compare transitive dependencies too
+        :param cache: f8a_utils.cache_utils.TreeCache, defaults to an in-memory cache
+                      shared by the calls in this process
+        :return: dict with "direct" and "transitive" changes, each of them having
+                 "added", "removed" and "changed" packages
+        """
         if type(show_transitive) is not bool:
             show_transitive = show_transitive == "true"
-        dependency_tree_generator = get_dependency_tree_generator(ecosystem)()
-        return dependency_tree_generator.get_dependencies(manifests, show_transitive)
+        cache = cache if cache is not None else _diff_cache
+        previous_key = cache.make_key(ecosystem, show_transitive, previous['content'])
+        if previous_key is not None and \
+                previous_key == cache.make_key(ecosystem, show_transitive, current['content']):
+            return {"direct": _diff_index({}, {}), "transitive": _diff_index({}, {})}
+
+        result = DependencyFinder.scan_and_find_dependencies(
+            ecosystem, [previous, current], show_transitive, compact=True, cache=cache)
+        previous_details, current_details = result['result'][0]['details']
+        previous_direct, previous_transitive = _index_dependencies(previous_details['_resolved'])
+        current_direct, current_transitive = _index_dependencies(current_details['_resolved'])
+        return {
+            "direct": _diff_index(previous_direct, current_direct),
+            "transitive": _diff_index(previous_transitive, current_transitive)
+        }
 
     @staticmethod
     def clean_version(version):
         """Clean Version."""
         # TODO: Remove caller from Component Analyses for Golang.
-        return GoTree.clean_version(version)
+        return get_dependency_tree_generator("golang").clean_version(version)
+
+    @staticmethod
+    def clean_versions(versions):
+        """Clean many versions, see `clean_version`."""
+        return get_dependency_tree_generator("golang").clean_versions(versions)
@@ -0,0 +1,502 @@
+"""Directed dependency graphs with memoized transitive closure."""
+
+import logging
+from array import array
+from collections import defaultdict, deque
+from functools import lru_cache
+
+_logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def _numpy():
+    """Import NumPy on first use by CSRDependencyGraph, None if it's not installed.
+
+    It's not imported with the module, the default graph does not need it.
+    """
+    try:
+        import numpy
+    except ImportError:  # pragma: no cover
+        return None
+    return numpy
+
+
+class DependencyGraph:
+    """Directed dependency graph.
+
+    Nodes reachable from a node are found by a depth first search visiting every
+    node once, so it takes time linear in the size of the subgraph below the node.
+    The result is memoized for the queried node only, no closures are kept for the
+    intermediate nodes. Dependency cycles are detected as strongly connected
+    components (Tarjan's algorithm).
+    """
+
+    def __init__(self):
+        """Init method for DependencyGraph class."""
+        self._children = defaultdict(list)
+        self._closure = {}
+        # Nodes searched for dependency cycles already.
+        self._scanned = set()
+        self.cycles = []
+
+    def add_edge(self, parent, child):
+        """Add edge parent -> child into the graph."""
+        self._children[parent].append(child)
+        if self._scanned:
+            # Graph has changed, memoized closures are not valid anymore.
+            self._closure = {}
+            self._scanned = set()
+            self.cycles = []
+
+    def children(self, node):
+        """Return direct dependencies of the node."""
+        return self._children.get(node, ())
+
+    def __contains__(self, node):
+        """Check if the node has any outgoing edge."""
+        return node in self._children
+
+    def reachable(self, node):
+        """Return all nodes reachable from the node.
+
+        Nodes are listed in depth first pre-order, each of them exactly once. The node
+        itself is part of the result only if it is a member of a dependency cycle,
+        all members of a cycle share the same result.
+
+        :param node: node to start from
+        :return: tuple of reachable nodes
+        """
+        closure = self._closure.get(node)
+        if closure is None:
+            if node not in self._scanned:
+                self._find_cycles(node)
+            closure = self._closure[node] = self._search(node)
+        return closure
+
+    def transitive_count(self, node):
+        """Return number of nodes reachable from the node."""
+        return len(self.reachable(node))
+
+    def parents(self, node):
+        """Return parents of nodes reachable from the node on their shortest paths from it.
+
+        :param node: node to start from
+        :return: dict mapping reachable node to its parent
+        """
+        parents = {}
+        queue = deque([node])
+        while queue:
+            parent = queue.popleft()
+            for child in self.children(parent):
+                if child not in parents and child != node:
+                    parents[child] = parent
+                    queue.append(child)
+        return parents
+
+    def depth(self, node):
+        """Return number of levels of dependencies below the node (shortest paths)."""
+        levels = {node: 0}
+        queue = deque([node])
+        depth = 0
+        while queue:
+            parent = queue.popleft()
+            for child in self.children(parent):
+                if child not in levels:
+                    levels[child] = depth = levels[parent] + 1
+                    queue.append(child)
+        return depth
+
+    def _search(self, node):
+        """List nodes reachable from the node in depth first pre-order."""
+        result = []
+        seen = set()
+        stack = [iter(self.children(node))]
+        while stack:
+            for child in stack[-1]:
+                if child not in seen:
+                    seen.add(child)
+                    result.append(child)
+                    stack.append(iter(self.children(child)))
+                    break
+            else:
+                stack.pop()
+        return tuple(result)
+
+    def _find_cycles(self, root):
+        """Find dependency cycles among nodes reachable from root not searched yet.
+
+        Iterative version of Tarjan's algorithm, linear in the number of edges.
+        """
+        index = {root: 0}
+        lowlink = {root: 0}
+        scc_stack = [root]
+        on_stack = {root}
+        work = [(root, iter(self.children(root)))]
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if child in self._scanned:
+                    continue
+                if child not in index:
+                    index[child] = lowlink[child] = len(index)
+                    scc_stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(self.children(child))))
+                    break
+                if child in on_stack:
+                    lowlink[node] = min(lowlink[node], index[child])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = scc_stack.pop()
+                        on_stack.discard(member)
+                        self._scanned.add(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or node in self.children(node):
+                        self.cycles.append(component)
+                        _logger.debug('Dependency cycle detected: {}'.format(
+                            ' -> '.join(str(member) for member in component)))
+
+
+class CSRDependencyGraph:
+    """Compact directed dependency graph for very large trees.
+
+    Nodes are interned into integer ids and edges are kept in compressed sparse
+    row (CSR) arrays. Reachable nodes are found by a breadth first search over the
+    arrays with one visited bytearray reused by all the searches, no reachable sets
+    are kept, so memory stays linear in the size of the graph. NumPy, when installed,
+    is used to build the arrays and for the vectorized breadth first search in `depth`.
+
+    Interface is the same as of DependencyGraph, but reachable nodes are listed
+    in the order they first appeared in the graph, not in depth first order.
+    """
+
+    def __init__(self):
+        """Init method for CSRDependencyGraph class."""
+        self._ids = {}
+        self._names = []
+        self._sources = array('i')
+        self._targets = array('i')
+        self._indptr = None
+        self._indices = None
+        self._visited = None
+        # Nodes searched for dependency cycles already.
+        self._scanned = None
+        self.cycles = []
+
+    def _intern(self, node):
+        node_id = self._ids.get(node)
+        if node_id is None:
+            node_id = self._ids[node] = len(self._names)
+            self._names.append(node)
+        return node_id
+
+    def add_edge(self, parent, child):
+        """Add edge parent -> child into the graph."""
+        self._sources.append(self._intern(parent))
+        self._targets.append(self._intern(child))
+        # Graph has changed, CSR arrays and found cycles are not valid anymore.
+        self._indptr = None
+
+    def _freeze(self):
+        """Build CSR arrays from the edges added so far."""
+        if self._indptr is not None:
+            return
+        size = len(self._names)
+        numpy = _numpy()
+        if numpy is not None:
+            sources = numpy.array(self._sources, dtype=numpy.int64)
+            order = numpy.argsort(sources, kind='stable')
+            indices = numpy.array(self._targets, dtype=numpy.int32)[order]
+            indptr = numpy.zeros(size + 1, dtype=numpy.int64)
+            numpy.cumsum(numpy.bincount(sources, minlength=size), out=indptr[1:])
+            # Plain arrays are much faster than NumPy ones for scalar access.
+            self._indptr = array('q', indptr.tobytes())
+            self._indices = array('i', indices.tobytes())
+        else:
+            indptr = array('q', bytes(8 * (size + 1)))
+            for source in self._sources:
+                indptr[source + 1] += 1
+            for i in range(size):
+                indptr[i + 1] += indptr[i]
+            position = array('q', indptr[:-1])
+            indices = array('i', bytes(4 * len(self._targets)))
+            for source, target in zip(self._sources, self._targets):
+                indices[position[source]] = target
+                position[source] += 1
+            self._indptr = indptr
+            self._indices = indices
+        self._visited = bytearray(size)
+        self._scanned = bytearray(size)
+        self.cycles = []
+
+    def _child_ids(self, node_id):
+        return self._indices[self._indptr[node_id]:self._indptr[node_id + 1]]
+
+    def children(self, node):
+        """Return direct dependencies of the node."""
+        node_id = self._ids.get(node)
+        if node_id is None:
+            return ()
+        self._freeze()
+        return [self._names[child] for child in self._child_ids(node_id)]
+
+    def __contains__(self, node):
+        """Check if the node has any outgoing edge."""
+        node_id = self._ids.get(node)
+        if node_id is None:
+            return False
+        self._freeze()
+        return self._indptr[node_id + 1] > self._indptr[node_id]
+
+    def _reachable_ids(self, node):
+        """Return sorted ids of nodes reachable from the node."""
+        node_id = self._ids.get(node)
+        if node_id is None:
+            return []
+        self._freeze()
+        if not self._scanned[node_id]:
+            self._find_cycles(node_id)
+        indptr = self._indptr
+        indices = self._indices
+        visited = self._visited
+        result = []
+        parent = node_id
+        position = 0
+        while True:
+            for child in indices[indptr[parent]:indptr[parent + 1]]:
+                if not visited[child]:
+                    visited[child] = 1
+                    result.append(child)
+            if position == len(result):
+                break
+            parent = result[position]
+            position += 1
+        for child in result:
+            visited[child] = 0
+        result.sort()
+        return result
+
+    def reachable(self, node):
+        """Return all nodes reachable from the node.
+
+        Each node is listed exactly once. The node itself is part of the result only
+        if it is a member of a dependency cycle.
+
+        :param node: node to start from
+        :return: tuple of reachable nodes
+        """
+        names = self._names
+        return tuple(names[node_id] for node_id in self._reachable_ids(node))
+
+    def transitive_count(self, node):
+        """Return number of nodes reachable from the node."""
+        return len(self._reachable_ids(node))
+
+    def parents(self, node):
+        """Return parents of nodes reachable from the node on their shortest paths from it.
+
+        :param node: node to start from
+        :return: dict mapping reachable node to its parent
+        """
+        node_id = self._ids.get(node)
+        if node_id is None:
+            return {}
+        self._freeze()
+        parent_ids = {}
+        queue = deque([node_id])
+        while queue:
+            parent = queue.popleft()
+            for child in self._child_ids(parent):
+                if child not in parent_ids and child != node_id:
+                    parent_ids[child] = parent
+                    queue.append(child)
+        names = self._names
+        return {names[child]: names[parent] for child, parent in parent_ids.items()}
+
+    def depth(self, node):
+        """Return number of levels of dependencies below the node (shortest paths)."""
+        node_id = self._ids.get(node)
+        if node_id is None:
+            return 0
+        self._freeze()
+        numpy = _numpy()
+        if numpy is None:
+            return self._depth_python(node_id)
+        indptr = numpy.frombuffer(self._indptr, dtype=numpy.int64)
+        indices = numpy.frombuffer(self._indices, dtype=numpy.int32)
+        visited = numpy.zeros(len(self._names), dtype=bool)
+        visited[node_id] = True
+        frontier = numpy.array([node_id])
+        depth = 0
+        while True:
+            starts = indptr[frontier]
+            lengths = indptr[frontier + 1] - starts
+            ends = lengths.cumsum()
+            if not ends.size or not ends[-1]:
+                return depth
+            # Positions of all the children of the frontier in the indices array.
+            positions = numpy.arange(ends[-1]) + numpy.repeat(starts + lengths - ends, lengths)
+            children = numpy.unique(indices[positions])
+            frontier = children[~visited[children]]
+            if not frontier.size:
+                return depth
+            visited[frontier] = True
+            depth += 1
+
+    def _depth_python(self, node_id):
+        levels = {node_id: 0}
+        queue = deque([node_id])
+        depth = 0
+        while queue:
+            parent = queue.popleft()
+            for child in self._child_ids(parent):
+                if child not in levels:
+                    levels[child] = depth = levels[parent] + 1
+                    queue.append(child)
+        return depth
+
+    def _find_cycles(self, root):
+        """Find dependency cycles among nodes reachable from root not searched yet.
+
+        Same iterative Tarjan's algorithm as in DependencyGraph, on node ids.
+        """
+        scanned = self._scanned
+        index = {root: 0}
+        lowlink = {root: 0}
+        scc_stack = [root]
+        on_stack = {root}
+        work = [(root, iter(self._child_ids(root)))]
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if scanned[child]:
+                    continue
+                if child not in index:
+                    index[child] = lowlink[child] = len(index)
+                    scc_stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(self._child_ids(child))))
+                    break
+                if child in on_stack:
+                    lowlink[node] = min(lowlink[node], index[child])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = scc_stack.pop()
+                        on_stack.discard(member)
+                        scanned[member] = 1
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or node in self._child_ids(node):
+                        self.cycles.append([self._names[member] for member in component])
+
+
+class SharedNodeTable:
+    """Table of dependency nodes shared by the graphs of many manifests.
+
+    Every node is stored as its record (dict) with ids of its dependencies in `deps`.
+    Nodes with equal records and equal dependencies are stored only once, whatever
+    graph they come from, so identical subgraphs of different manifests share
+    their entries. Dependency cycles are shared as whole components.
+    """
+
+    def __init__(self):
+        """Init method for SharedNodeTable class."""
+        self.nodes = []
+        self._ids = {}
+
+    def add(self, roots, children, to_record):
+        """Add all the nodes reachable from the roots into the table.
+
+        :param roots: list of nodes to start from
+        :param children: callable returning dependencies of a node
+        :param to_record: callable returning record (flat dict) of a node
+        :return: list of ids of the roots
+        """
+        ids = {}
+        index = {}
+        lowlink = {}
+        scc_stack = []
+        on_stack = set()
+        for root in roots:
+            if root in ids:
+                continue
+            index[root] = lowlink[root] = len(index)
+            scc_stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(children(root)))]
+            while work:
+                node, node_children = work[-1]
+                for child in node_children:
+                    if child in ids:
+                        continue
+                    if child not in index:
+                        index[child] = lowlink[child] = len(index)
+                        scc_stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(children(child))))
+                        break
+                    if child in on_stack:
+                        lowlink[node] = min(lowlink[node], index[child])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[node])
+                    if lowlink[node] == index[node]:
+                        component = []
+                        while True:
+                            member = scc_stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        self._add_component(component, children, to_record, ids)
+        return [ids[root] for root in roots]
+
+    def _add_component(self, component, children, to_record, ids):
+        """Add strongly connected component, all dependencies outside of it are added already."""
+        if len(component) == 1 and component[0] not in children(component[0]):
+            node = component[0]
+            record = to_record(node)
+            deps = [ids[child] for child in children(node)]
+            key = (tuple(record.items()), tuple(deps))
+            node_id = self._ids.get(key)
+            if node_id is None:
+                node_id = self._ids[key] = len(self.nodes)
+                entry = dict(record)
+                entry['deps'] = deps
+                self.nodes.append(entry)
+            ids[node] = node_id
+            return
+        records = {member: to_record(member) for member in component}
+        # Members are ordered by their records, so equal cycles get equal keys.
+        members = sorted(component, key=lambda member: repr(tuple(records[member].items())))
+        position = {member: i for i, member in enumerate(members)}
+        refs = [tuple((True, position[child]) if child in position else (False, ids[child])
+                      for child in children(member))
+                for member in members]
+        key = (tuple(tuple(records[member].items()) for member in members), tuple(refs))
+        first = self._ids.get(key)
+        if first is None:
+            first = self._ids[key] = len(self.nodes)
+            for member, member_refs in zip(members, refs):
+                entry = dict(records[member])
+                entry['deps'] = [first + ref if in_cycle else ref for in_cycle, ref in member_refs]
+                self.nodes.append(entry)
+        for member in members:
+            ids[member] = first + position[member]
@@ -0,0 +1,246 @@
+"""Dependency tree generator of Golang module graphs."""
+
+import sys
+from collections import namedtuple
+from functools import lru_cache, partial
+import semver
+from f8a_utils.base_tree_generator import COORDINATES_CACHE_SIZE, DependencyTreeGenerator
+from f8a_utils.tree_expansion import LazyDependencies, add_graph_paths, get_transitive_nodes, \
+    intern_records
+
+# Maximal number of cleaned Golang version strings cached.
+_VERSIONS_CACHE_SIZE = 2 ** 12
+
+
+class GolangCoordinates(namedtuple('GolangCoordinates', ['source', 'package', 'given_version',
+                                                         'is_semver', 'version'])):
+    """Parsed Golang package, source is the string it was parsed from."""
+
+    __slots__ = ()
+
+    def to_dict(self):
+        """Convert to dictionary as returned by `_parse_string`."""
+        return {'from': self.source,
+                'package': self.package,
+                'given_version': self.given_version,
+                'is_semver': self.is_semver,
+                'version': self.version}
+
+
+class GolangDependencyTreeGenerator(DependencyTreeGenerator):
+    """Generate Golang Dependency Tree."""
+
+    ecosystem = "golang"
+
+    def _scan_manifest(self, manifest, show_transitive, lazy=False, reverse_index=False,
+                       max_nodes=None, max_depth=None, deadline=None, mvs=False):
+        """Check Go Lang Dependencies.
+
+        :param manifest: manifest to scan
+        :param show_transitive: bool, resolve transitive dependencies
+        :param lazy: bool, resolve transitive deps on first access
+        :param reverse_index: bool, add `_reverse_index` of the transitive deps to the details
+        :param max_nodes: int, maximal number of walked transitive deps per manifest
+        :param max_depth: int, maximal depth of transitive dependencies, None for unlimited
+        :param deadline: float, time.time() after which no more transitive deps are reported
+        :param mvs: bool, report every module once, in the version selected by minimal
+                    version selection of go, instead of all the required versions
+        :return: details of the manifest
+        """
+        dep = self._new_details(manifest)
+        resolved = []
+        index = {} if reverse_index and show_transitive else None
+        budget = self._new_budget(max_nodes, max_depth, deadline)
+        graph, direct_deps = self._build_graph(
+            self._clean_dependencies(manifest['content']))
+        selection = None
+        if mvs:
+            selection = self._select_versions(graph, direct_deps)
+            direct_deps = list(dict.fromkeys(selection[direct_dep] for direct_dep in direct_deps))
+        for direct_dep in direct_deps:
+            parsed_json = self._parse_coordinates(direct_dep).to_dict()
+            transitive_list = []
+            if show_transitive:
+                if lazy:
+                    transitive_list = LazyDependencies(
+                        partial(self._parse_transitives, graph, direct_dep, selection))
+                else:
+                    nodes = get_transitive_nodes(graph, direct_dep, budget)
+                    if selection is not None:
+                        nodes = self._collapse_transitives(nodes, direct_dep, selection)
+                    transitive_list = self._parse_nodes(nodes, selection)
+                    if index is not None:
+                        records = dict(zip(nodes, transitive_list))
+                        reported = None
+                        if selection is not None:
+                            # Paths go through the required versions, only the last
+                            # module on them is reported in its selected version.
+                            reported = records
+                            records = {node: self._parse_string(node) for node in nodes}
+                        add_graph_paths(index, graph, direct_dep, self._parse_string(direct_dep),
+                                        records, self._parse_string, reported)
+            parsed_json["deps"] = transitive_list
+            resolved.append(parsed_json)
+        dep['_resolved'] = resolved
+        if index is not None:
+            dep['_reverse_index'] = index
+        if budget is not None and budget.truncated:
+            dep['truncated'] = True
+        return dep
+
+    def _build_result(self, details, compact=False):
+        """Wrap details of all the manifests into the result.
+
+        Golang result always has just one {"details": details} entry.
+        """
+        if compact:
+            intern_records(details)
+        return {"result": [{"details": details}]}
+
+    def _get_node_graph(self, manifest):
+        """Get dependency graph of `go mod graph` output."""
+        graph, direct_deps = self._build_graph(self._clean_dependencies(manifest['content']))
+        return direct_deps, graph.children, self._parse_string
+
+    def _build_graph(self, dependencies):
+        """Index `go mod graph` output.
+
+        :param dependencies: list of `go mod graph` lines
+        :return: tuple (DependencyGraph, list of direct dependencies of the module)
+        """
+        graph = self.graph_class()
+        direct_deps = []
+        seen_direct_deps = set()
+        for dependency in dependencies:
+            prefix, suffix = dependency.strip().split(" ")
+            graph.add_edge(prefix, suffix)
+            # Only Module Packages have no @ in Prefix.
+            if '@' not in prefix and suffix not in seen_direct_deps:
+                seen_direct_deps.add(suffix)
+                direct_deps.append(suffix)
+        return graph, direct_deps
+
+    def _parse_transitives(self, graph, direct_dep, selection=None):
+        """Scan the golang transitive deps.
+
+        :param selection: dict mapping nodes to the selected versions of their modules,
+                          see `_select_versions`, None to report all the versions
+        """
+        nodes = graph.reachable(direct_dep)
+        if selection is not None:
+            nodes = self._collapse_transitives(nodes, direct_dep, selection)
+        return self._parse_nodes(nodes, selection)
+
+    def _parse_nodes(self, nodes, selection=None):
+        """Parse nodes of transitive deps, or their selected versions, into dictionaries."""
+        if selection is not None:
+            nodes = nodes.values()
+        return [self._parse_coordinates(node).to_dict() for node in nodes]
+
+    def _select_versions(self, graph, direct_deps):
+        """Select version of every module required by the main module.
+
+        Like minimal version selection of go, the highest of the versions required
+        anywhere in the graph reachable from the main module is selected.
+
+        :param graph: graph of `go mod graph` output
+        :param direct_deps: list of direct dependencies of the main module
+        :return: dict mapping every reachable node to the node of the selected version
+        """
+        nodes = dict.fromkeys(direct_deps)
+        for direct_dep in direct_deps:
+            nodes.update(dict.fromkeys(graph.reachable(direct_dep)))
+        selected = {}
+        for node in nodes:
+            coordinates = self._parse_coordinates(node)
+            best = selected.get(coordinates.package)
+            if best is None or self._is_newer(coordinates, self._parse_coordinates(best)):
+                selected[coordinates.package] = node
+        return {node: selected[self._parse_coordinates(node).package] for node in nodes}
+
+    @staticmethod
+    def _is_newer(coordinates, other):
+        """Check if the version of coordinates is higher than version of the other ones.
+
+        Versions which are not semantic ones are never preferred to semantic ones.
+        """
+        if not coordinates.is_semver:
+            return False
+        if not other.is_semver:
+            return True
+        return semver.VersionInfo.parse(coordinates.version).compare(other.version) > 0
+
+    def _collapse_transitives(self, nodes, direct_dep, selection):
+        """Collapse transitive deps of the direct dep to the selected versions.
+
+        :param nodes: nodes reachable from the direct dep
+        :return: dict mapping the first reachable node of every module to the node of
+                 its selected version, the module of the direct dep itself is left out
+        """
+        collapsed = {}
+        reported = {direct_dep}
+        for node in nodes:
+            selected = selection[node]
+            if selected not in reported:
+                reported.add(selected)
+                collapsed[node] = selected
+        return collapsed
+
+    def _parse_string(self, deps_string):
+        """Parse string representation into a dictionary."""
+        return self._parse_coordinates(deps_string).to_dict()
+
+    @staticmethod
+    @lru_cache(maxsize=COORDINATES_CACHE_SIZE)
+    def _parse_coordinates(deps_string):
+        """Parse string representation into GolangCoordinates, results are cached."""
+        ncolons = deps_string.count('@')
+        if ncolons == 0:
+            package, given_version = deps_string, ''
+        elif ncolons == 1:
+            package, given_version = deps_string.split('@')
+        else:
+            raise ValueError('Invalid Golang Pkg %s', deps_string)
+
+        is_semver, version = GolangDependencyTreeGenerator.clean_version(given_version)
+        return GolangCoordinates(deps_string, sys.intern(package), sys.intern(given_version),
+                                 is_semver, sys.intern(version))
+
+    @staticmethod
+    def _clean_dependencies(dependencies) -> list:
+        """Clean Golang Dep."""
+        if isinstance(dependencies, bytes):
+            dependencies = dependencies.decode("utf-8")
+        dependencies = dependencies[:dependencies.rfind('\n')]
+        if not dependencies:
+            raise ValueError('Dependency list cannot be empty')
+        return dependencies.split('\n')
+
+    @staticmethod
+    @lru_cache(maxsize=_VERSIONS_CACHE_SIZE)
+    def clean_version(version):
+        """Clean Version, results are cached."""
+        version = version.replace('v', '', 1)
+        try:
+            version = str(semver.VersionInfo.parse(version))
+            is_semver = True
+        except ValueError:
+            is_semver = False
+        version = version.split('+')[0]
+        return is_semver, version
+
+    @staticmethod
+    def clean_versions(versions):
+        """Clean many versions, every distinct one is parsed only once.
+
+        :param versions: iterable of version strings
+        :return: list of (is_semver, version) tuples, in order of the versions
+        """
+        clean_version = GolangDependencyTreeGenerator.clean_version
+        cleaned = {}
+        result = []
+        for version in versions:
+            if version not in cleaned:
+                cleaned[version] = clean_version(version)
+            result.append(cleaned[version])
+        return result
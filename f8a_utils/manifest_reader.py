@@ -0,0 +1,205 @@
+"""Readers of manifest content given as str, bytes, file objects or paths.
+
+Manifests are read line by line or chunk by chunk, JSON manifests can be walked
+value by value with `JsonStream`, so large manifests don't have to be loaded whole.
+"""
+
+import codecs
+import io
+import json
+import mmap
+import os
+import re
+
+# Size of chunks (in characters or bytes) JSON manifests are streamed by.
+_JSON_CHUNK_SIZE = 64 * 1024
+
+_JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# Characters which can follow a complete JSON number.
+_JSON_NUMBER_END = re.compile(r'[ \t\n\r,\]}]')
+
+# Characters which open or close JSON containers and strings.
+_JSON_STRUCTURE = re.compile(r'["{}\[\]]')
+
+
+def iter_lines(content):
+    """Iterate over the lines of a manifest without loading all of them at once.
+
+    :param content: str or bytes content, a text/binary file object or a path to the file
+    :return: generator of lines (str) without line terminators
+    """
+    if isinstance(content, os.PathLike):
+        with open(content, 'rb') as fd:
+            if os.fstat(fd.fileno()).st_size == 0:
+                return
+            with mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for line in iter(mapped.readline, b''):
+                    yield line.decode('utf-8').rstrip('\r\n')
+    elif isinstance(content, str):
+        start = 0
+        end = content.find('\n')
+        while end != -1:
+            yield content[start:end].rstrip('\r')
+            start = end + 1
+            end = content.find('\n', start)
+        yield content[start:].rstrip('\r')
+    else:
+        if isinstance(content, (bytes, bytearray)):
+            # BytesIO shares the buffer of the bytes object, nothing is copied here.
+            content = io.BytesIO(content)
+        for line in content:
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
+            yield line.rstrip('\r\n')
+
+
+def iter_text_chunks(content, chunk_size=_JSON_CHUNK_SIZE):
+    """Iterate over the text of a manifest in chunks.
+
+    :param content: str or bytes content, a text/binary file object or a path to the file
+    :param chunk_size: int, size of the chunks to read and decode
+    :return: generator of str chunks
+    """
+    if isinstance(content, str):
+        yield content
+        return
+    if isinstance(content, os.PathLike):
+        with open(content, 'rb') as fd:
+            yield from iter_text_chunks(fd, chunk_size)
+        return
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    if isinstance(content, (bytes, bytearray)):
+        view = memoryview(content)
+        for start in range(0, len(view), chunk_size):
+            yield decoder.decode(view[start:start + chunk_size])
+    else:
+        while True:
+            chunk = content.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk if isinstance(chunk, str) else decoder.decode(chunk)
+    yield decoder.decode(b'', final=True)
+
+
+class JsonStream:
+    """Incremental reader of a JSON document from chunks of its text.
+
+    Containers are walked member by member with `items` and `elements`, values
+    are decoded whole with `value`, so only the value being read is kept in memory.
+    """
+
+    def __init__(self, chunks):
+        """Init method for JsonStream class."""
+        self._chunks = iter(chunks)
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self, size):
+        """Read at least size more characters into the buffer, return False at the end."""
+        parts = [self._buffer[self._pos:]] if self._pos < len(self._buffer) else []
+        read = 0
+        while read < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._eof = True
+                break
+            parts.append(chunk)
+            read += len(chunk)
+        self._buffer = parts[0] if len(parts) == 1 else ''.join(parts)
+        self._pos = 0
+        return read > 0
+
+    def peek(self):
+        """Return next non-whitespace character, empty string at the end."""
+        while True:
+            self._pos = _JSON_WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill(1):
+                return ''
+
+    def _expect(self, chars):
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError('Expecting one of {!r} in JSON manifest, got {!r}'.format(
+                chars, char))
+        self._pos += 1
+        return char
+
+    def value(self):
+        """Decode next value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except ValueError:
+                if self._eof:
+                    raise
+                # Double the buffer, so a large value is decoded in linear time.
+                self._fill(max(len(self._buffer) - self._pos, _JSON_CHUNK_SIZE))
+                continue
+            if not self._eof and isinstance(value, (int, float)) and \
+                    not _JSON_NUMBER_END.match(self._buffer, end):
+                # The number may continue in the next chunk, e.g. 1.5 of 1.5e10.
+                self._fill(1)
+                continue
+            self._pos = end
+            return value
+
+    def skip(self):
+        """Skip next value, containers are scanned without decoding their members."""
+        if self.peek() not in ('{', '['):
+            self.value()
+            return
+        depth = 0
+        while True:
+            match = _JSON_STRUCTURE.search(self._buffer, self._pos)
+            if match is None:
+                self._pos = len(self._buffer)
+                if not self._fill(_JSON_CHUNK_SIZE):
+                    raise ValueError('Unterminated value in JSON manifest')
+                continue
+            if match.group() == '"':
+                # Strings are decoded one by one, brackets in them are not structure.
+                self._pos = match.start()
+                self.value()
+                continue
+            self._pos = match.end()
+            depth += 1 if match.group() in '{[' else -1
+            if not depth:
+                return
+
+    def items(self):
+        """Iterate over keys of next object, the caller must read value of every key."""
+        self._expect('{')
+        if self.peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            self._expect(':')
+            yield key
+            if self._expect(',}') == '}':
+                return
+
+    def elements(self):
+        """Iterate over next array, the caller must read every element."""
+        self._expect('[')
+        if self.peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield
+            if self._expect(',]') == ']':
+                return
+
+
+def is_streamed(content, stream):
+    """Check if JSON manifest content is to be parsed incrementally.
+
+    Paths and file objects always are, str and bytes only when asked to.
+    """
+    return stream or not isinstance(content, (str, bytes, bytearray))
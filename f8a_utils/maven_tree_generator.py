@@ -0,0 +1,152 @@
+"""Dependency tree generator of Maven dependency:tree output."""
+
+import sys
+from collections import namedtuple
+from functools import lru_cache, partial
+from f8a_utils.base_tree_generator import COORDINATES_CACHE_SIZE, DependencyTreeGenerator
+from f8a_utils.manifest_reader import iter_lines
+from f8a_utils.tree_expansion import LazyDependencies, add_graph_paths, get_transitive_nodes
+
+# Characters surrounding a node name on an edge line of a dot graph.
+_DOT_NODE_STRIP_CHARS = ' \t\r\n";'
+
+# Meaning of colon separated parts of Maven coordinates, by number of parts.
+_MAVEN_COORDINATES_LAYOUTS = {
+    2: ('groupId', 'artifactId'),
+    3: ('groupId', 'artifactId', 'version'),
+    4: ('groupId', 'artifactId', 'packaging', 'version'),
+    # groupId:artifactId:packaging:version:scope
+    5: ('groupId', 'artifactId', 'packaging', 'version', 'scope'),
+    # groupId:artifactId:packaging:classifier:version:scope
+    6: ('groupId', 'artifactId', 'packaging', 'classifier', 'version', 'scope'),
+}
+
+
+class MavenCoordinates(namedtuple('MavenCoordinates', ['groupId', 'artifactId', 'packaging',
+                                                       'version', 'classifier', 'scope',
+                                                       'package'])):
+    """Parsed Maven coordinates, package is in groupId:artifactId format."""
+
+    __slots__ = ()
+
+    def to_dict(self):
+        """Convert to dictionary as returned by `_parse_string`."""
+        return {'groupId': self.groupId,
+                'artifactId': self.artifactId,
+                'packaging': self.packaging,
+                'version': self.version,
+                'classifier': self.classifier,
+                'scope': self.scope}
+
+    def to_record(self):
+        """Convert to dependency record of the result."""
+        return {"package": self.package, "version": self.version}
+
+
+class MavenDependencyTreeGenerator(DependencyTreeGenerator):
+    """Generate Maven Dependency Tree."""
+
+    ecosystem = "maven"
+
+    def _scan_manifest(self, manifest, show_transitive, lazy=False, reverse_index=False,
+                       max_nodes=None, max_depth=None, deadline=None):
+        """Scan the maven dependencies file and fetch transitive deps."""
+        dep = self._new_details(manifest)
+        resolved = []
+        index = {} if reverse_index and show_transitive else None
+        budget = self._new_budget(max_nodes, max_depth, deadline)
+        graph, direct_deps = self._build_graph(manifest['content'])
+        for direct in direct_deps:
+            # Add meta data to generated tree.
+            coordinates = self._parse_coordinates(direct)
+            if coordinates.scope == 'test':
+                # Don't process Test Dependencies.
+                continue
+            trans_list = []
+            if show_transitive:
+                if lazy:
+                    trans_list = LazyDependencies(
+                        partial(self._resolve_transitives, graph, direct))
+                else:
+                    nodes = get_transitive_nodes(graph, direct, budget)
+                    trans_list = self._parse_transitives(nodes)
+                    if index is not None:
+                        add_graph_paths(index, graph, direct, coordinates.to_record(),
+                                        dict(zip(nodes, trans_list)),
+                                        lambda node: self._parse_coordinates(node).to_record())
+            tmp_json = coordinates.to_record()
+            tmp_json["deps"] = trans_list
+            resolved.append(tmp_json)
+        dep['_resolved'] = resolved
+        if index is not None:
+            dep['_reverse_index'] = index
+        if budget is not None and budget.truncated:
+            dep['truncated'] = True
+        return dep
+
+    def _get_node_graph(self, manifest):
+        """Get dependency graph of the maven dependencies file, without test dependencies."""
+        graph, direct_deps = self._build_graph(manifest['content'])
+        roots = [direct for direct in direct_deps
+                 if self._parse_coordinates(direct).scope != 'test']
+        return roots, graph.children, lambda node: self._parse_coordinates(node).to_record()
+
+    def _parse_transitives(self, transitives: list) -> list:
+        """Scan the maven transitives."""
+        return [self._parse_coordinates(transitive).to_record() for transitive in transitives]
+
+    def _resolve_transitives(self, graph, direct):
+        """Scan the maven transitives of the direct dependency."""
+        return self._parse_transitives(graph.reachable(direct))
+
+    def _get_dependency_tree(self, content) -> dict:
+        """Build Dependency Tree.
+
+        :param content: file contents from dependency.txt (str, bytes, file object or path)
+        :return: Tree in format ({d1:[t1, t2]})
+        """
+        graph, direct_deps = self._build_graph(content)
+        return {direct: list(graph.reachable(direct)) for direct in direct_deps}
+
+    def _build_graph(self, content):
+        """Index dependency.txt.
+
+        The content is consumed line by line, so it can be passed as a file object
+        or a path (os.PathLike) to avoid keeping whole dependency.txt in memory.
+
+        :param content: file contents from dependency.txt (str, bytes, file object or path)
+        :return: tuple (DependencyGraph, list of direct dependencies of the modules)
+        """
+        direct_deps = {}
+        graph = self.graph_class()
+        module = ''
+        for line in iter_lines(content):
+            prefix, arrow, suffix = line.partition('->')
+            if arrow:
+                prefix = prefix.strip(_DOT_NODE_STRIP_CHARS)
+                suffix = suffix.strip(_DOT_NODE_STRIP_CHARS)
+                if prefix == module:
+                    direct_deps[suffix] = None
+                else:
+                    graph.add_edge(prefix, suffix)
+            else:
+                module = line[line.find('"') + 1:line.rfind('"')]
+        return graph, list(direct_deps)
+
+    @staticmethod
+    def _parse_string(coordinates_str):
+        """Parse string representation into a dictionary."""
+        return MavenDependencyTreeGenerator._parse_coordinates(coordinates_str).to_dict()
+
+    @staticmethod
+    @lru_cache(maxsize=COORDINATES_CACHE_SIZE)
+    def _parse_coordinates(coordinates_str):
+        """Parse string representation into MavenCoordinates, results are cached."""
+        parts = coordinates_str.split(':')
+        layout = _MAVEN_COORDINATES_LAYOUTS.get(len(parts))
+        if layout is None:
+            raise ValueError('Invalid Maven coordinates %s', coordinates_str)
+        a = dict.fromkeys(MavenCoordinates._fields, '')
+        a.update(zip(layout, map(sys.intern, parts)))
+        a['package'] = sys.intern(a['groupId'] + ':' + a['artifactId'])
+        return MavenCoordinates(**a)
@@ -71,54 +71,87 @@ class MavenUtils:
         :return list, list of versions
         """
         try:
-            g, a = package_name.split(':')
-            g = g.replace('.', '/')
-
-            filenames = {'maven-metadata.xml', 'maven-metadata-local.xml'}
-
-            versions = set()
-            version = ""
-            ok = False
-            for filename in filenames:
-
-                url = 'https://repo.maven.apache.org/maven2/{g}/{a}/{f}'.format(
-                    g=g, a=a, f=filename)
-                try:
-                    metadata_xml = etree.parse(urlopen(url))
-                    ok = True  # We successfully downloaded the file
-                    version_elements = metadata_xml.findall('.//version')
-                    version = metadata_xml.find('.//release').text if \
-                        metadata_xml.find('.//release') is not None else None
-                    versions = versions.union({x.text for x in version_elements})
-                except (OSError, etree.XMLSyntaxError):
-                    # Not both XML files have to exist, so don't freak out yet
-                    pass
-
-            if not ok and multi_source:
-                _logger.info('No value found in maven org. Searching in maven repo')
-                try:
-                    versions = self.get_versions_from_other_source(package_name)
-                    ok = True
-                except Exception:
-                    pass
-
-            if not ok:
-                _logger.info(
-                    'Unable to fetch versions for package {pkg_name}'.format(pkg_name=package_name)
-                )
-
-            if dual_values:
-                version = version if version else self.select_latest_version(list(versions))
-                return {'versions': list(versions),
-                        'latest_version': version}
-            if latest:
-                version = version if version else self.select_latest_version(list(versions))
-                return version
-            return list(versions)
+            versions, version, _ = self.fetch_versions(package_name, multi_source)
+            return self.format_versions(versions, version, latest, dual_values)
         except ValueError:
             # wrong package specification etc.
             return []
 
+    def fetch_versions(self, package_name, multi_source=False):
+        """Fetch versions of the package from Maven Central.
+
+        Raises ValueError for wrong package specification.
+
+        :param package_name: str, package name
+        :param multi_source: boolean, to fetch data from mvnrepository as well
+        :return: tuple (set of versions, release version or "", False if no source answered)
+        """
+        versions = set()
+        version = ""
+        ok = False
+        for url in self.metadata_urls(package_name):
+            try:
+                metadata_xml = etree.parse(urlopen(url))
+                ok = True  # We successfully downloaded the file
+                listed, version = self.parse_metadata(metadata_xml)
+                versions = versions.union(listed)
+            except (OSError, etree.XMLSyntaxError):
+                # Not both XML files have to exist, so don't freak out yet
+                pass
+
+        if not ok and multi_source:
+            _logger.info('No value found in maven org. Searching in maven repo')
+            try:
+                versions = self.get_versions_from_other_source(package_name)
+                ok = True
+            except Exception:
+                pass
+
+        if not ok:
+            _logger.info(
+                'Unable to fetch versions for package {pkg_name}'.format(pkg_name=package_name)
+            )
+        return versions, version, ok
+
+    @staticmethod
+    def metadata_urls(package_name):
+        """Get URLs of metadata files listing versions of the package in Maven Central.
+
+        Raises ValueError for wrong package specification.
+        """
+        g, a = package_name.split(':')
+        g = g.replace('.', '/')
+        return ['https://repo.maven.apache.org/maven2/{g}/{a}/{f}'.format(g=g, a=a, f=filename)
+                for filename in ('maven-metadata.xml', 'maven-metadata-local.xml')]
+
+    @staticmethod
+    def parse_metadata(metadata_xml):
+        """Get versions and release version listed in parsed maven-metadata.xml.
+
+        :param metadata_xml: lxml element tree of the metadata file
+        :return: tuple (set of versions, release version or None)
+        """
+        version_elements = metadata_xml.findall('.//version')
+        release = metadata_xml.find('.//release')
+        return {x.text for x in version_elements}, release.text if release is not None else None
+
+    def format_versions(self, versions, version, latest=False, dual_values=False):
+        """Format versions found as requested by `get_versions_for_maven_package`.
+
+        :param versions: set of all versions
+        :param version: release version, if known
+        :param latest: boolean value, to return only the latest version
+        :param dual_values: boolean value, to return both version list and latest version
+        """
+        if dual_values:
+            version = version if version else self.select_latest_version(list(versions))
+            return {'versions': list(versions),
+                    'latest_version': version}
+        if latest:
+            version = version if version else self.select_latest_version(list(versions))
+            return version
+        return list(versions)
+
     def select_latest_version(self, versions=[]):
         """Select latest version from list."""
         if len(versions) == 0:
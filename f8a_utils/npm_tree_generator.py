@@ -0,0 +1,396 @@
+"""Dependency tree generator of npm list output and package-lock.json files."""
+
+import json
+from functools import partial
+from f8a_utils.base_tree_generator import DependencyTreeGenerator
+from f8a_utils.manifest_reader import JsonStream, is_streamed, iter_text_chunks
+from f8a_utils.tree_expansion import ExpansionBudget, LazyDependencies, add_graph_paths, \
+    add_reverse_path
+
+
+class NpmDependencyTreeGenerator(DependencyTreeGenerator):
+    """Generate NPM Dependency Tree.
+
+    Both nested `npm ls --json` output and package-lock.json v2/v3 with the flat
+    `packages` map are supported.
+    """
+
+    ecosystem = "npm"
+
+    def _scan_manifest(self, manifest, show_transitive, lazy=False, reverse_index=False,
+                       max_nodes=None, max_depth=None, deadline=None, dedup=False, stream=False):
+        """Scan the npm dependencies file to fetch transitive deps.
+
+        :param manifest: manifest to scan, its content can be str, bytes, a file object
+                         or a path
+        :param show_transitive: bool, resolve transitive dependencies
+        :param lazy: bool, resolve transitive deps on first access; ignored with limits,
+                     as the budget is shared by all direct dependencies of the manifest
+        :param reverse_index: bool, add `_reverse_index` of the transitive deps to the details
+        :param max_nodes: int, maximal number of transitive dependencies per manifest
+        :param max_depth: int, maximal depth of transitive dependencies, None for unlimited
+        :param deadline: float, time.time() after which no more transitive deps are reported
+        :param dedup: bool, report every (package, version) only once per direct dependency
+        :param stream: bool, parse str and bytes content incrementally, one top-level
+                       dependency at a time, as paths and file objects always are
+        :return: details of the manifest
+        """
+        dep = self._new_details(manifest)
+
+        data = manifest['content']
+        budget = self._new_budget(max_nodes, max_depth, deadline)
+        lazy = lazy and budget is None
+        index = {} if reverse_index and show_transitive is True else None
+        if is_streamed(data, stream):
+            dep['_resolved'] = self._resolve_stream(data, show_transitive, dedup, budget, index)
+            if index is not None:
+                dep['_reverse_index'] = index
+            if budget is not None and budget.truncated:
+                dep['truncated'] = True
+            return dep
+
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+
+        content = json.loads(data)
+        if content.get('packages'):
+            resolved = self._resolve_lockfile(
+                content['packages'], show_transitive, dedup, budget, lazy, index)
+        else:
+            resolved = self._resolve_tree(content.get('dependencies'), show_transitive, dedup,
+                                          budget, lazy, index)
+        dep['_resolved'] = resolved
+        if index is not None:
+            dep['_reverse_index'] = index
+        if budget is not None and budget.truncated:
+            dep['truncated'] = True
+        return dep
+
+    def _get_node_graph(self, manifest):
+        """Get dependency graph of the npm dependencies file.
+
+        Nodes are installation paths for lockfiles and (name, id of the entry)
+        pairs for nested `npm ls --json` output.
+        """
+        data = manifest['content']
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        content = json.loads(data)
+        packages = content.get('packages')
+        if packages:
+            graph = self._build_lockfile_graph(packages)
+            roots = []
+            for name in self._get_lockfile_requires(packages.get('', {})):
+                path = self._find_lockfile_path(packages, '', name)
+                if path is not None and packages[path].get('version'):
+                    roots.append(path)
+            return roots, graph.children, partial(self._get_lockfile_record, packages)
+
+        entries = {}
+
+        def versioned(dependencies):
+            nodes = []
+            for key, val in (dependencies or {}).items():
+                if self._get_version(val):
+                    entries[id(val)] = val
+                    nodes.append((key, id(val)))
+            return nodes
+
+        def children(node):
+            return versioned(self._get_nested_dependencies(entries[node[1]]))
+
+        def to_record(node):
+            return {"package": node[0], "version": self._get_version(entries[node[1]])}
+
+        return versioned(content.get('dependencies')), children, to_record
+
+    def _resolve_stream(self, content, show_transitive, dedup, budget=None, index=None):
+        """Resolve dependencies parsing the manifest incrementally.
+
+        Top-level dependencies of `npm ls --json` output are decoded and resolved one
+        by one. The `packages` map of lockfiles needs to be decoded whole; lockfiles
+        have legacy `dependencies` too, they are skipped once `packages` is known and
+        their resolution is thrown away, with its budget and index, if `packages`
+        follows them.
+        """
+        resolved = []
+        tree_budget = budget.copy() if budget is not None else None
+        tree_index = {} if index is not None else None
+        packages = None
+        json_stream = JsonStream(iter_text_chunks(content))
+        for key in json_stream.items():
+            if key == 'dependencies' and packages is None and json_stream.peek() == '{':
+                for name in json_stream.items():
+                    resolved.extend(self._resolve_tree(
+                        {name: json_stream.value()}, show_transitive, dedup, tree_budget,
+                        index=tree_index))
+            elif key == 'packages' and packages is None:
+                packages = json_stream.value() or None
+            else:
+                json_stream.skip()
+        if packages:
+            return self._resolve_lockfile(packages, show_transitive, dedup, budget, index=index)
+        if budget is not None:
+            budget.update(tree_budget)
+        if index is not None:
+            index.update(tree_index)
+        return resolved
+
+    def _resolve_tree(self, dependencies, show_transitive, dedup, budget=None, lazy=False,
+                      index=None):
+        """Resolve dependencies from nested `npm ls --json` output."""
+        resolved = []
+        for key, val in (dependencies or {}).items():
+            version = self._get_version(val)
+            if version:
+                transitive = []
+                if show_transitive is True:
+                    tr_deps = self._get_nested_dependencies(val)
+                    if tr_deps and lazy:
+                        transitive = LazyDependencies(
+                            partial(self._parse_transitives, tr_deps, dedup))
+                    elif tr_deps:
+                        on_path = None
+                        if index is not None:
+                            on_path = partial(add_reverse_path, index,
+                                              {"package": key, "version": version})
+                        transitive = self._parse_transitives(tr_deps, dedup, on_path=on_path,
+                                                             budget=budget)
+                tmp_json = {
+                    "package": key,
+                    "version": version,
+                    "deps": transitive
+                }
+                resolved.append(tmp_json)
+        return resolved
+
+    def _parse_transitives(self, content, dedup=False, max_depth=None, max_nodes=None,
+                           on_path=None, budget=None):
+        """Walk the nested npm dependencies to fetch transitive deps.
+
+        Dependencies are walked with an explicit stack in depth first pre-order.
+
+        :param content: dict of nested dependencies of a direct dependency
+        :param dedup: bool, skip (package, version) pairs, and their subtrees, seen already
+        :param max_depth: int, maximal depth to descend to, None for unlimited
+        :param max_nodes: int, maximal number of reported dependencies, None for unlimited
+        :param on_path: callable called with the list of records on the path to every
+                        reported dependency, the dependency itself is the last one
+        :param budget: ExpansionBudget shared with other direct dependencies, replaces
+                       max_depth and max_nodes
+        :return: list of transitive dependencies
+        """
+        if budget is None and (max_depth is not None or max_nodes is not None):
+            budget = ExpansionBudget(max_nodes, max_depth)
+        transitive = []
+        seen = set()
+        # Records of the dependencies the walk descended into.
+        ancestors = []
+        stack = [iter(content.items())]
+        while stack:
+            for key, val in stack[-1]:
+                version = self._get_version(val)
+                if not version:
+                    continue
+                if dedup:
+                    if (key, version) in seen:
+                        continue
+                    seen.add((key, version))
+                if budget is not None and not budget.take():
+                    return transitive
+                record = {
+                    "package": key,
+                    "version": version
+                }
+                transitive.append(record)
+                if on_path is not None:
+                    on_path(ancestors + [record])
+                tr_deps = self._get_nested_dependencies(val)
+                if tr_deps and (budget is None or budget.descend(len(stack))):
+                    stack.append(iter(tr_deps.items()))
+                    ancestors.append(record)
+                    break
+            else:
+                stack.pop()
+                if ancestors:
+                    ancestors.pop()
+        return transitive
+
+    @staticmethod
+    def _get_version(val):
+        """Get version of a package from npm ls entry."""
+        required = val.get('required')
+        return val.get('version') or (required.get('version') if isinstance(required, dict)
+                                      else None)
+
+    @staticmethod
+    def _get_nested_dependencies(val):
+        """Get nested dependencies of a package from npm ls entry."""
+        required = val.get('required')
+        return val.get('dependencies') or (required.get('dependencies')
+                                           if isinstance(required, dict) else None)
+
+    def _resolve_lockfile(self, packages, show_transitive, dedup, budget=None, lazy=False,
+                          index=None):
+        """Resolve dependencies from the flat `packages` map of package-lock.json v2/v3.
+
+        Without limits, transitive deps are resolved from the graph of installation
+        paths, which shares the subtrees of all direct dependencies. The limits
+        depend on the order of the walk, so they are enforced by walking the map.
+        """
+        resolved = []
+        graph = None
+        if show_transitive is True and budget is None:
+            graph = self._build_lockfile_graph(packages)
+        for name in self._get_lockfile_requires(packages.get('', {})):
+            path = self._find_lockfile_path(packages, '', name)
+            if path is None:
+                continue
+            version = packages[path].get('version')
+            if version:
+                transitive = []
+                direct = {"package": name, "version": version}
+                if graph is not None and lazy:
+                    transitive = LazyDependencies(partial(
+                        self._parse_lockfile_graph_transitives, graph, packages, path, dedup))
+                elif graph is not None:
+                    records = {} if index is not None else None
+                    transitive = self._parse_lockfile_graph_transitives(
+                        graph, packages, path, dedup, records)
+                    if index is not None:
+                        add_graph_paths(index, graph, path, direct, records,
+                                        partial(self._get_lockfile_record, packages))
+                elif show_transitive is True:
+                    on_path = None
+                    if index is not None:
+                        on_path = partial(add_reverse_path, index, direct)
+                    transitive = self._parse_lockfile_transitives(
+                        packages, path, dedup, on_path=on_path, budget=budget)
+                resolved.append({
+                    "package": name,
+                    "version": version,
+                    "deps": transitive
+                })
+        return resolved
+
+    def _build_lockfile_graph(self, packages):
+        """Build graph of installation paths from the lockfile `packages` map."""
+        graph = self.graph_class()
+        for path, entry in packages.items():
+            for name in self._get_lockfile_requires(entry):
+                child = self._find_lockfile_path(packages, path, name)
+                if child is not None:
+                    graph.add_edge(path, child)
+        return graph
+
+    def _parse_lockfile_graph_transitives(self, graph, packages, path, dedup=False,
+                                          records=None):
+        """Fetch transitive deps of package installed at path from the lockfile graph.
+
+        :param records: dict filled with installation paths of the reported deps
+                        mapped to their records, if given
+        """
+        transitive = []
+        seen = set()
+        for child in graph.reachable(path):
+            if child == path or not packages[child].get('version'):
+                continue
+            record = self._get_lockfile_record(packages, child)
+            if dedup:
+                if (record['package'], record['version']) in seen:
+                    continue
+                seen.add((record['package'], record['version']))
+            transitive.append(record)
+            if records is not None:
+                records[child] = record
+        return transitive
+
+    @staticmethod
+    def _get_lockfile_record(packages, path):
+        """Get dependency record of package installed at path."""
+        if 'node_modules/' in path:
+            name = path.rpartition('node_modules/')[2]
+        else:
+            # Workspace package linked from node_modules.
+            name = packages[path].get('name', path)
+        return {
+            "package": name,
+            "version": packages[path].get('version')
+        }
+
+    def _parse_lockfile_transitives(self, packages, path, dedup=False, max_depth=None,
+                                    max_nodes=None, on_path=None, budget=None):
+        """Walk the flat lockfile `packages` map to fetch transitive deps.
+
+        Every installation path is reported at most once, so dependency cycles
+        are harmless. Parameters have the same meaning as in `_parse_transitives`.
+        """
+        if budget is None and (max_depth is not None or max_nodes is not None):
+            budget = ExpansionBudget(max_nodes, max_depth)
+        transitive = []
+        seen = set()
+        ancestors = []
+        seen_paths = {path}
+        stack = [(path, iter(self._get_lockfile_requires(packages[path])))]
+        while stack:
+            parent, names = stack[-1]
+            for name in names:
+                child = self._find_lockfile_path(packages, parent, name)
+                if child is None or child in seen_paths:
+                    continue
+                seen_paths.add(child)
+                version = packages[child].get('version')
+                if not version:
+                    continue
+                if dedup:
+                    if (name, version) in seen:
+                        continue
+                    seen.add((name, version))
+                if budget is not None and not budget.take():
+                    return transitive
+                record = {
+                    "package": name,
+                    "version": version
+                }
+                transitive.append(record)
+                if on_path is not None:
+                    on_path(ancestors + [record])
+                requires = self._get_lockfile_requires(packages[child])
+                if requires and (budget is None or budget.descend(len(stack))):
+                    stack.append((child, iter(requires)))
+                    ancestors.append(record)
+                    break
+            else:
+                stack.pop()
+                if ancestors:
+                    ancestors.pop()
+        return transitive
+
+    @staticmethod
+    def _get_lockfile_requires(entry):
+        """Get names of runtime dependencies of a lockfile `packages` entry."""
+        names = list(entry.get('dependencies') or {})
+        names.extend(entry.get('optionalDependencies') or {})
+        return names
+
+    @staticmethod
+    def _find_lockfile_path(packages, parent, name):
+        """Find installation path of `name` required by package installed at `parent`.
+
+        Follows node module resolution: the nearest node_modules directory wins.
+        Workspace links are followed to their target.
+        """
+        while True:
+            if parent:
+                path = parent + '/node_modules/' + name
+            else:
+                path = 'node_modules/' + name
+            if path in packages:
+                if packages[path].get('link'):
+                    path = packages[path].get('resolved')
+                    return path if path in packages else None
+                return path
+            if not parent:
+                return None
+            cut = parent.rfind('/node_modules/')
+            parent = parent[:cut] if cut != -1 else ''
@@ -0,0 +1,63 @@
+"""Dependency tree generator of pip list output."""
+
+import json
+from f8a_utils.base_tree_generator import DependencyTreeGenerator
+from f8a_utils.manifest_reader import JsonStream, is_streamed, iter_text_chunks
+from f8a_utils.tree_expansion import add_reverse_path
+
+
+class PypiDependencyTreeGenerator(DependencyTreeGenerator):
+    """Generate Pypi Dependency Tree."""
+
+    ecosystem = "pypi"
+
+    def _scan_manifest(self, manifest, reverse_index=False, stream=False, **_options):
+        """Scan the Pypi dependencies file to fetch transitive deps.
+
+        Transitive deps are part of the manifest, so they are never lazy and nothing
+        is expanded within the limits; `show_transitive`, `lazy` and the limits are
+        ignored. The manifest lists them flat, so paths in the reverse index lead
+        directly to them. With `stream`, and for paths and file objects, the list
+        is parsed incrementally, one direct dependency at a time.
+        """
+        dep = self._new_details(manifest)
+        data = manifest['content']
+
+        if is_streamed(data, stream):
+            json_stream = JsonStream(iter_text_chunks(data))
+            content = [json_stream.value() for _ in json_stream.elements()]
+        else:
+            if isinstance(data, bytes):
+                data = data.decode("utf-8")
+            content = json.loads(data)
+        dep['_resolved'] = content
+        if reverse_index:
+            index = {}
+            for direct in content:
+                direct_record = {"package": direct['package'], "version": direct['version']}
+                for record in direct.get('deps') or []:
+                    add_reverse_path(index, direct_record, [record])
+            dep['_reverse_index'] = index
+        return dep
+
+    def _get_node_graph(self, manifest):
+        """Get dependency graph of the Pypi dependencies file.
+
+        Nodes are positions of direct deps and of their deps in the file.
+        """
+        data = manifest['content']
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        content = json.loads(data)
+
+        def children(node):
+            if len(node) == 1:
+                return [(node[0], i) for i in range(len(content[node[0]].get('deps') or []))]
+            return []
+
+        def to_record(node):
+            if len(node) == 1:
+                return {key: value for key, value in content[node[0]].items() if key != 'deps'}
+            return dict(content[node[0]]['deps'][node[1]])
+
+        return [(i,) for i in range(len(content))], children, to_record
@@ -0,0 +1,91 @@
+"""Incremental JSON serialization of dependency tree results.
+
+Results are written to a sink, manifest by manifest and direct dependency by
+direct dependency, so neither the whole result nor its whole JSON text has to be
+held in memory. The text is the same `json.dumps(result, default=list)` would
+produce for the single entry (compact) layout of the result.
+"""
+
+import io
+import json
+
+# Number of characters buffered before they are passed to the sink.
+_BUFFER_SIZE = 64 * 1024
+
+_ENCODER = json.JSONEncoder(default=list)
+
+
+class _SinkWriter:
+    """Buffered writer of text to a file-like or socket-like object."""
+
+    def __init__(self, sink, buffer_size=_BUFFER_SIZE):
+        self.buffer_size = buffer_size
+        self.parts = []
+        self.size = 0
+        if hasattr(sink, 'sendall'):
+            self._send = sink.sendall
+            self.text = False
+        else:
+            self._send = sink.write
+            self.text = isinstance(sink, io.TextIOBase)
+
+    def write(self, text):
+        """Write the text, pass the buffer to the sink once it's full."""
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Pass all the buffered text to the sink."""
+        if not self.parts:
+            return
+        data = ''.join(self.parts)
+        self.parts = []
+        self.size = 0
+        self._send(data if self.text else data.encode('utf-8'))
+
+
+def _write_details(writer, dep):
+    """Write details of single manifest, one direct dependency at a time."""
+    writer.write('{')
+    for i, (key, value) in enumerate(dep.items()):
+        if i:
+            writer.write(', ')
+        writer.write(_ENCODER.encode(key) + ': ')
+        if key == '_resolved' and isinstance(value, list):
+            writer.write('[')
+            for j, direct in enumerate(value):
+                if j:
+                    writer.write(', ')
+                writer.write(_ENCODER.encode(direct))
+            writer.write(']')
+        else:
+            writer.write(_ENCODER.encode(value))
+    writer.write('}')
+
+
+def write_result(details, sink, extra=None, buffer_size=_BUFFER_SIZE):
+    """Write result with single entry holding the details to the sink as JSON.
+
+    :param details: iterable of details of the manifests, consumed one by one
+    :param sink: object with `sendall` (socket) or `write` method, text files
+                 get str, other objects UTF-8 encoded bytes
+    :param extra: dict, other keys of the result entry, e.g. table of shared nodes
+    :param buffer_size: int, number of characters passed to the sink at once
+    :return: number of manifests written
+    """
+    writer = _SinkWriter(sink, buffer_size)
+    writer.write('{"result": [{"details": [')
+    count = 0
+    for dep in details:
+        if count:
+            writer.write(', ')
+        _write_details(writer, dep)
+        count += 1
+    writer.write(']')
+    for key, value in (extra or {}).items():
+        writer.write(', ' + _ENCODER.encode(key) + ': ' + _ENCODER.encode(value))
+    writer.write('}]}')
+    writer.flush()
+    return count
@@ -0,0 +1,205 @@
+"""Compact binary serialization of dependency tree results.
+
+Encoded result consists of a small JSON header and an array of unsigned 32-bit
+integers. The header holds the table of distinct scalar values (atoms), the
+table of distinct key lists of dependency records (shapes) and the manifest
+details other than resolved dependencies. The integer array holds every distinct
+dependency record once, as its shape and atoms, followed by the direct
+dependencies of every manifest with the record ids of their transitive deps.
+
+Decoded equal dependency records share one dict instance, as in the compact
+result of `DependencyTreeGenerator.get_dependencies`.
+"""
+
+import json
+import struct
+import sys
+from array import array
+
+_MAGIC = b'F8AT'
+_FORMAT_VERSION = 1
+_PREFIX = struct.Struct('<4sBI')
+
+# Number of transitive deps of a direct dependency without `deps` key.
+_NO_DEPS = 0xFFFFFFFF
+
+
+class _Encoder:
+    """State of a single encoding, see `encode_result`."""
+
+    def __init__(self):
+        self.atoms = []
+        self.atom_ids = {}
+        self.shapes = []
+        self.shape_ids = {}
+        self.records = array('I')
+        self.record_ids = {}
+        # First instance of every record, it also keeps ids of the instances stable.
+        self.instances = []
+        # Record ids by id() of the instances, built once records turn out to be shared.
+        self.identity_ids = None
+
+    def atom(self, value):
+        """Return id of the scalar value."""
+        key = (type(value), value)
+        atom_id = self.atom_ids.get(key)
+        if atom_id is None:
+            atom_id = self.atom_ids[key] = len(self.atoms)
+            self.atoms.append(value)
+        return atom_id
+
+    def record(self, record):
+        """Return id of the record, add it to the table if it's not there yet.
+
+        Raises AttributeError for records which are not dicts and TypeError for
+        records with unhashable (nested) values.
+        """
+        key = tuple(record.items())
+        record_id = self.record_ids.get(key)
+        if record_id is None:
+            shape = tuple(record)
+            shape_id = self.shape_ids.get(shape)
+            if shape_id is None:
+                shape_id = self.shape_ids[shape] = len(self.shapes)
+                self.shapes.append(shape)
+            self.records.append(shape_id)
+            self.records.extend([self.atom(value) for value in record.values()])
+            record_id = self.record_ids[key] = len(self.instances)
+            self.instances.append(record)
+        elif self.identity_ids is None and self.instances[record_id] is record:
+            # Records are shared (compact result), look them up by identity from now on.
+            self.identity_ids = {id(instance): i for i, instance in enumerate(self.instances)}
+        if self.identity_ids is not None:
+            self.identity_ids[id(record)] = record_id
+        return record_id
+
+    def resolved(self, resolved, stream):
+        """Encode resolved dependencies of a manifest, raise TypeError if they don't fit."""
+        if not isinstance(resolved, list):
+            raise TypeError('resolved dependencies are not a list')
+        encoded = array('I', [len(resolved)])
+        record = self.record
+        for direct in resolved:
+            fields = {key: value for key, value in direct.items() if key != 'deps'}
+            encoded.append(record(fields))
+            if 'deps' not in direct:
+                encoded.append(_NO_DEPS)
+                continue
+            deps = list(direct['deps'])
+            encoded.append(len(deps))
+            identity_ids = self.identity_ids
+            if identity_ids is None:
+                encoded.extend([record(dep) for dep in deps])
+            else:
+                encoded.extend([identity_ids.get(id(dep)) or record(dep) for dep in deps])
+        stream.extend(encoded)
+
+
+def encode_result(result):
+    """Encode result of `get_dependencies` into bytes.
+
+    Manifests with resolved dependencies of unexpected structure are kept
+    in the JSON header as they are.
+
+    :param result: dict with the results, legacy or compact
+    :return: bytes
+    """
+    encoder = _Encoder()
+    stream = array('I')
+    details_lists = []
+    entries = []
+    for entry in result['result']:
+        details = entry['details']
+        # Other keys of the entry, e.g. table of shared nodes, are kept in the header.
+        extra = {key: value for key, value in entry.items() if key != 'details'}
+        for i, known in enumerate(details_lists):
+            if known is details:
+                entries.append([i, extra])
+                break
+        else:
+            entries.append([len(details_lists), extra])
+            details_lists.append(details)
+
+    header_details = []
+    for details in details_lists:
+        metas = []
+        for dep in details:
+            meta = {key: value for key, value in dep.items() if key != '_resolved'}
+            if '_resolved' in dep:
+                try:
+                    encoder.resolved(dep['_resolved'], stream)
+                    # Wrapped in a list to mark resolved deps stored in the stream.
+                    meta = [meta]
+                except (AttributeError, TypeError):
+                    meta['_resolved'] = dep['_resolved']
+            metas.append(meta)
+        header_details.append(metas)
+
+    header = json.dumps({
+        'atoms': encoder.atoms,
+        'shapes': encoder.shapes,
+        'details': header_details,
+        'entries': entries,
+        'records': len(encoder.instances),
+    }, separators=(',', ':'), default=list).encode('utf-8')
+    body = encoder.records
+    body.extend(stream)
+    if sys.byteorder != 'little':
+        body.byteswap()
+    return _PREFIX.pack(_MAGIC, _FORMAT_VERSION, len(header)) + header + body.tobytes()
+
+
+def decode_result(data):
+    """Decode result encoded by `encode_result`.
+
+    :param data: bytes
+    :return: dict with the results
+    """
+    magic, version, header_size = _PREFIX.unpack_from(data)
+    if magic != _MAGIC or version != _FORMAT_VERSION:
+        raise ValueError('Not an encoded dependency tree result')
+    offset = _PREFIX.size
+    header = json.loads(bytes(data[offset:offset + header_size]).decode('utf-8'))
+    stream = array('I')
+    stream.frombytes(data[offset + header_size:])
+    if sys.byteorder != 'little':
+        stream.byteswap()
+
+    atoms = header['atoms']
+    shapes = header['shapes']
+    records = []
+    pos = 0
+    for _ in range(header['records']):
+        shape = shapes[stream[pos]]
+        end = pos + 1 + len(shape)
+        records.append(dict(zip(shape, [atoms[atom] for atom in stream[pos + 1:end]])))
+        pos = end
+
+    details_lists = []
+    for metas in header['details']:
+        details = []
+        for meta in metas:
+            if isinstance(meta, dict):
+                details.append(meta)
+                continue
+            dep = meta[0]
+            resolved = []
+            count = stream[pos]
+            pos += 1
+            for _ in range(count):
+                direct = dict(records[stream[pos]])
+                size = stream[pos + 1]
+                pos += 2
+                if size != _NO_DEPS:
+                    direct['deps'] = [records[i] for i in stream[pos:pos + size]]
+                    pos += size
+                resolved.append(direct)
+            dep['_resolved'] = resolved
+            details.append(dep)
+        details_lists.append(details)
+    result = []
+    for i, extra in header['entries']:
+        entry = {"details": details_lists[i]}
+        entry.update(extra)
+        result.append(entry)
+    return {"result": result}
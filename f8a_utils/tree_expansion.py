@@ -0,0 +1,260 @@
+"""Expansion of transitive dependencies within limits, reverse index of their paths."""
+
+import time
+from collections.abc import Sequence
+
+
+def intern_records(details):
+    """Make equal dependency records of all manifests share one dict instance.
+
+    :param details: list of per-manifest details
+    :return: the same list, records in `deps` are replaced in place
+    """
+    records = {}
+    for dep in details:
+        for resolved in dep.get('_resolved') or []:
+            transitives = resolved.get('deps') if isinstance(resolved, dict) else None
+            if not isinstance(transitives, list):
+                continue
+            for i, record in enumerate(transitives):
+                try:
+                    transitives[i] = records.setdefault(tuple(record.items()), record)
+                except (AttributeError, TypeError):
+                    # Not a flat record, keep it as it is.
+                    pass
+    return details
+
+
+def add_reverse_path(index, direct, path):
+    """Record in the reverse index that the last record of the path is pulled by direct dep.
+
+    Only the first path from every direct dependency is recorded.
+
+    :param index: reverse index, {package: {version: [{"package", "version", "path"}]}}
+    :param direct: record of the direct dependency, without its `deps`
+    :param path: list of records from a dependency of the direct one to the transitive one
+    """
+    record = path[-1]
+    reached_by = index.setdefault(record['package'], {}).setdefault(record['version'], [])
+    # All paths from one direct dependency are recorded before the next one is walked.
+    if reached_by and reached_by[-1]['package'] == direct['package'] and \
+            reached_by[-1]['version'] == direct['version']:
+        return
+    reached_by.append({"package": direct['package'],
+                       "version": direct['version'],
+                       "path": [direct] + path})
+
+
+def get_transitive_nodes(graph, node, budget=None):
+    """Get nodes reachable from the node within the budget."""
+    if budget is None:
+        return graph.reachable(node)
+    # The limits are checked as the graph is walked, not after the whole closure is known.
+    return walk_graph(graph, node, budget)
+
+
+def add_graph_paths(index, graph, direct, direct_record, records, to_record, reported=None):
+    """Record shortest paths from the direct dependency to its transitive deps.
+
+    :param index: reverse index, see `add_reverse_path`
+    :param graph: graph the transitive deps were resolved from
+    :param direct: node of the direct dependency
+    :param direct_record: record of the direct dependency, without its `deps`
+    :param records: dict mapping nodes of the transitive deps to their records
+    :param to_record: callable converting other nodes on the paths to records
+    :param reported: dict mapping nodes of the transitive deps to records reported
+                     for them instead, at the end of their paths only
+    """
+    parents = graph.parents(direct)
+    paths = {direct: []}
+    for node, record in records.items():
+        chain = []
+        parent = node
+        while parent not in paths:
+            chain.append(parent)
+            parent = parents[parent]
+        path = paths[parent]
+        for parent in reversed(chain):
+            path = path + [records[parent] if parent in records else to_record(parent)]
+            paths[parent] = path
+        if node != direct:
+            path = paths[node]
+            if reported is not None:
+                path = path[:-1] + [reported[node]]
+            add_reverse_path(index, direct_record, path)
+
+
+def walk_graph(graph, node, budget):
+    """Walk the graph depth first from the node within the budget.
+
+    Every node is reported once. With a depth limit, it is expanded again when it
+    is reached at a smaller depth, so the limit cuts off the same nodes as a breadth
+    first walk would; without it every node is expanded once.
+
+    :param graph: DependencyGraph or compatible
+    :param node: node to start from
+    :param budget: ExpansionBudget
+    :return: list of reported nodes, in depth first pre-order
+    """
+    reported = []
+    depths = {}
+    # Nodes with dependencies not expanded because of the depth limit.
+    cut = set()
+    stack = [iter(graph.children(node))]
+    while stack:
+        depth = len(stack)
+        for child in stack[-1]:
+            if depths.get(child, depth + 1) <= depth or \
+                    child in depths and budget.max_depth is None:
+                continue
+            if child not in depths:
+                if not budget.take():
+                    return reported
+                reported.append(child)
+            depths[child] = depth
+            if child in graph:
+                if budget.max_depth is None or depth < budget.max_depth:
+                    cut.discard(child)
+                    stack.append(iter(graph.children(child)))
+                    break
+                cut.add(child)
+        else:
+            stack.pop()
+    if cut:
+        budget.truncated = True
+    return reported
+
+
+class ExpansionBudget:
+    """Limits of transitive expansion shared by all the direct deps of a manifest.
+
+    Once a limit is hit, `truncated` is set and no more dependencies are reported.
+    """
+
+    __slots__ = ('nodes', 'max_depth', 'deadline', 'truncated')
+
+    def __init__(self, max_nodes=None, max_depth=None, deadline=None):
+        """Init method for ExpansionBudget class.
+
+        :param max_nodes: int, maximal number of reported transitive deps, None for unlimited
+        :param max_depth: int, maximal depth to descend to, None for unlimited
+        :param deadline: float, time.time() after which no more deps are reported
+        """
+        self.nodes = max_nodes
+        self.max_depth = max_depth
+        self.deadline = deadline
+        self.truncated = False
+
+    def take(self):
+        """Account one more reported dependency, return False if it can't be reported."""
+        if self.nodes is not None and self.nodes <= 0 or \
+                self.deadline is not None and time.time() >= self.deadline:
+            self.truncated = True
+            return False
+        if self.nodes is not None:
+            self.nodes -= 1
+        return True
+
+    def copy(self):
+        """Return independent budget with the same limits left."""
+        budget = ExpansionBudget(self.nodes, self.max_depth, self.deadline)
+        budget.truncated = self.truncated
+        return budget
+
+    def update(self, other):
+        """Take over what is left of other budget, e.g. of a copy whose work is kept."""
+        self.nodes = other.nodes
+        self.truncated = other.truncated
+
+    def descend(self, depth):
+        """Check if dependencies of a dependency at the depth can be reported."""
+        if self.max_depth is not None and depth >= self.max_depth:
+            self.truncated = True
+            return False
+        return True
+
+
+def expand_shared_nodes(result):
+    """Expand result with shared node table into compact result with transitive deps.
+
+    :param result: result of `get_dependencies` called with `shared_nodes=True`
+    :return: compact result, equal dependency records share one dict instance
+    """
+    entry = result['result'][0]
+    nodes = entry['nodes']
+    records = [{key: value for key, value in node.items() if key != 'deps'} for node in nodes]
+    details = []
+    for dep in entry['details']:
+        dep = dict(dep)
+        resolved = []
+        for direct in dep['_resolved']:
+            direct = dict(direct)
+            node_id = direct.pop('node', None)
+            if node_id is not None:
+                reached = {}
+                stack = [iter(nodes[node_id]['deps'])]
+                while stack:
+                    for child in stack[-1]:
+                        if child not in reached:
+                            reached[child] = None
+                            stack.append(iter(nodes[child]['deps']))
+                            break
+                    else:
+                        stack.pop()
+                direct['deps'] = [records[child] for child in reached]
+            resolved.append(direct)
+        dep['_resolved'] = resolved
+        details.append(dep)
+    return {"result": [{"details": details}]}
+
+
+class LazyDependencies(Sequence):
+    """Read-only sequence of transitive dependencies resolved on first access.
+
+    json module can't serialize it directly, use `json.dumps(result, default=list)`.
+    """
+
+    __slots__ = ('_resolve', '_items')
+
+    def __init__(self, resolve):
+        """Init method for LazyDependencies class.
+
+        :param resolve: callable without arguments returning list of dependencies
+        """
+        self._resolve = resolve
+        self._items = None
+
+    @property
+    def resolved(self):
+        """Check if the dependencies have been resolved already."""
+        return self._items is not None
+
+    def _get_items(self):
+        if self._items is None:
+            self._items = self._resolve()
+            self._resolve = None
+        return self._items
+
+    def __getitem__(self, index):
+        """Return dependency at the index."""
+        return self._get_items()[index]
+
+    def __len__(self):
+        """Return number of dependencies."""
+        return len(self._get_items())
+
+    def __iter__(self):
+        """Iterate over dependencies."""
+        return iter(self._get_items())
+
+    def __eq__(self, other):
+        """Compare with other sequence of dependencies."""
+        if isinstance(other, Sequence) and not isinstance(other, (str, bytes)):
+            return self._get_items() == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        """Return representation of resolved dependencies."""
+        if self._items is None:
+            return '{}(<unresolved>)'.format(type(self).__name__)
+        return '{}({!r})'.format(type(self).__name__, self._items)
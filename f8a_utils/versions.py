@@ -1,13 +1,155 @@
 """Helper functions related to versions."""
 
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import requests
 import logging
+from urllib.parse import urlsplit
+from lxml import etree
+from requests.adapters import HTTPAdapter
 from f8a_version_comparator.comparable_version import ComparableVersion
+from f8a_utils.cache_utils import SqliteCacheBackend, VersionCache
 from f8a_utils.golang_utils import GolangUtils
 from f8a_utils.maven_utils import MavenUtils
 
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
 _logger = logging.getLogger(__name__)
 
+# Event loop running the current coroutine; get_event_loop() returns it before Python 3.7.
+_get_running_loop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)
+
+# Options of HTTP sessions used to query package registries, see `configure_sessions`.
+_session_options = {
+    'pool_size': int(os.environ.get('VERSIONS_HTTP_POOL_SIZE', 16)),
+    'connect_timeout': float(os.environ.get('VERSIONS_HTTP_CONNECT_TIMEOUT', 3.05)),
+    'read_timeout': float(os.environ.get('VERSIONS_HTTP_READ_TIMEOUT', 30)),
+    'keep_alive': os.environ.get('VERSIONS_HTTP_KEEP_ALIVE', 'true').lower() == 'true',
+    'host_concurrency': int(os.environ.get('VERSIONS_HOST_CONCURRENCY', 8)),
+    'async_pool_size': int(os.environ.get('VERSIONS_ASYNC_POOL_SIZE', 100)),
+}
+
+# Sessions by registry host (scheme and netloc), each of them with its own connection pool.
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+# Registries queried by version lookups of the ecosystems.
+_REGISTRY_HOSTS = {
+    'npm': 'https://registry.npmjs.org',
+    'pypi': 'https://pypi.python.org',
+    'maven': 'https://repo.maven.apache.org',
+    'golang': 'https://pkg.go.dev',
+}
+
+_NPM_PACKAGE_URL = _REGISTRY_HOSTS['npm'] + '/{pkg_name}'
+_PYPI_PACKAGE_URL = _REGISTRY_HOSTS['pypi'] + '/pypi/{pkg_name}/json'
+
+# Semaphores limiting concurrent bulk lookups by registry host.
+_host_semaphores = {}
+
+# aiohttp sessions of asynchronous lookups by event loop.
+_async_sessions = weakref.WeakKeyDictionary()
+
+
+def _default_version_cache():
+    """Create on-disk cache of versions shared by the processes, if configured.
+
+    VERSIONS_CACHE_PATH is path of the sqlite database, every process on the node
+    (e.g. gunicorn workers) using the same path shares the cached versions and they
+    survive restarts of the processes.
+    """
+    path = os.environ.get('VERSIONS_CACHE_PATH')
+    if not path:
+        return None
+    max_bytes = int(os.environ.get('VERSIONS_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+    try:
+        return VersionCache(SqliteCacheBackend(path, max_bytes=max_bytes))
+    except sqlite3.Error as e:
+        # Lookups work without the cache, the module must be importable anyway.
+        _logger.warning('Unable to open cache of versions {path}: {e}'.format(path=path, e=e))
+        return None
+
+
+# Cache of looked up versions, see `set_version_cache`.
+_version_cache = _default_version_cache()
+
+# Returned by registry fetches when the cached versions have not changed.
+_NOT_MODIFIED = object()
+
+
+def configure_sessions(pool_size=None, connect_timeout=None, read_timeout=None,
+                       keep_alive=None, host_concurrency=None, async_pool_size=None):
+    """Set options of the HTTP sessions used to query package registries.
+
+    Sessions created before are closed, new ones are created with the options on
+    next request. Options not given keep their values.
+
+    :param pool_size: int, maximal number of connections kept open to a single host
+    :param connect_timeout: float, seconds to wait for connection to the host
+    :param read_timeout: float, seconds to wait for data from the host
+    :param keep_alive: bool, reuse connections for subsequent requests
+    :param host_concurrency: int, maximal number of concurrent lookups of packages
+                             from a single registry, see `get_versions_and_latest_for_many`,
+                             and of connections of asynchronous lookups to a single host
+    :param async_pool_size: int, maximal number of connections of asynchronous lookups
+                            in an event loop; applies to sessions created from now on, see
+                            `get_async_session`
+    """
+    options = {'pool_size': pool_size, 'connect_timeout': connect_timeout,
+               'read_timeout': read_timeout, 'keep_alive': keep_alive,
+               'host_concurrency': host_concurrency, 'async_pool_size': async_pool_size}
+    with _sessions_lock:
+        _session_options.update({key: value for key, value in options.items()
+                                 if value is not None})
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+        _host_semaphores.clear()
+
+
+def get_session(url):
+    """Return HTTP session shared by all the requests to the host of the url.
+
+    Sessions are thread-safe for sending requests, connections to the host are
+    pooled and kept alive between the requests.
+
+    :param url: str, URL of the request
+    :return: requests.Session
+    """
+    parts = urlsplit(url)
+    host = '{}://{}'.format(parts.scheme, parts.netloc)
+    session = _sessions.get(host)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1,
+                                      pool_maxsize=_session_options['pool_size'])
+                session.mount(host, adapter)
+                if not _session_options['keep_alive']:
+                    session.headers['Connection'] = 'close'
+                _sessions[host] = session
+    return session
+
+
+def _http_get(url, headers=None, **kwargs):
+    """Send GET request to the url through the shared session of its host."""
+    if headers:
+        kwargs['headers'] = headers
+    kwargs.setdefault('timeout', (_session_options['connect_timeout'],
+                                  _session_options['read_timeout']))
+    return get_session(url).get(url, **kwargs)
+
 
 def get_versions_and_latest_for_ep(ecosystem, package_name, multi_source=False):
     """Get all versions for given (ecosystem, package).
@@ -33,6 +175,50 @@ def get_versions_and_latest_for_ep(ecosystem, package_name, multi_source=False):
         raise ValueError('Unsupported ecosystem: {e}'.format(e=ecosystem))
 
 
+def get_versions_and_latest_for_many(ecosystem, packages, max_concurrency=16,
+                                     multi_source=False):
+    """Get all versions and the latest version of many packages concurrently.
+
+    Packages are looked up in a pool of threads, at most `host_concurrency` lookups
+    (see `configure_sessions`) are sent to the registry at once, even by concurrent calls.
+
+    :param ecosystem: str, ecosystem name
+    :param packages: iterable of package names
+    :param max_concurrency: int, maximal number of lookups running at once by this call
+    :param multi_source: bool, fetch data from more than 1 source. applicable for maven
+    :return dict, package name to the result of `get_versions_and_latest_for_ep`, or
+            to {'error': message} if the lookup failed
+    """
+    if ecosystem not in _REGISTRY_HOSTS:
+        raise ValueError('Unsupported ecosystem: {e}'.format(e=ecosystem))
+    packages = list(dict.fromkeys(packages))
+    if not packages:
+        return {}
+    host = _REGISTRY_HOSTS[ecosystem]
+    with _sessions_lock:
+        semaphore = _host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = _host_semaphores[host] = threading.BoundedSemaphore(
+                _session_options['host_concurrency'])
+
+    def lookup(package_name):
+        with semaphore:
+            return get_versions_and_latest_for_ep(ecosystem, package_name, multi_source)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(packages)))) as executor:
+        futures = [(package_name, executor.submit(lookup, package_name))
+                   for package_name in packages]
+        for package_name, future in futures:
+            try:
+                results[package_name] = future.result()
+            except Exception as e:
+                _logger.info('Unable to fetch versions for package {pkg_name}: {e}'.format(
+                    pkg_name=package_name, e=e))
+                results[package_name] = {'error': str(e)}
+    return results
+
+
 def get_versions_for_ep(ecosystem, package_name, multi_source=False):
     """Get all versions for given (ecosystem, package).
 
@@ -90,6 +276,107 @@ def get_latest_versions_for_ep(ecosystem, package_name, multi_source=False):
     return version
 
 
+def set_version_cache(cache):
+    """Set cache of versions used by all the lookups, None disables caching.
+
+    Fresh cached versions are returned without asking the registry. Stale versions
+    of npm and PyPI packages are revalidated with the registry by conditional request,
+    unchanged versions are not downloaded again. Use `VersionCache` with
+    `SqliteCacheBackend` to share the cache by all the processes on the node; such
+    cache is used by default if VERSIONS_CACHE_PATH is set.
+
+    :param cache: f8a_utils.cache_utils.VersionCache or None
+    :return: cache used before
+    """
+    global _version_cache
+    previous, _version_cache = _version_cache, cache
+    return previous
+
+
+def _select_versions(value, latest, dual_values):
+    """Select requested part of versions and latest version of a package."""
+    if not isinstance(value, dict):
+        return value
+    if dual_values:
+        return value
+    if latest:
+        return value['latest_version']
+    return value['versions']
+
+
+def _cached_versions(ecosystem, package_name, latest, dual_values, fetch, options=None):
+    """Look up versions of a package through the version cache.
+
+    :param fetch: callable taking headers of conditional request, returning tuple
+                  (versions and latest version as with `dual_values`, or _NOT_MODIFIED;
+                  dict of validators to cache them with, None if they must not be cached)
+    :param options: dict, other options the versions depend on
+    """
+    cache = _version_cache
+    if cache is None:
+        return _select_versions(fetch({})[0], latest, dual_values)
+    key = cache.make_key(ecosystem, package_name, options)
+    entry = cache.get(key)
+    if entry is None or not cache.is_fresh(ecosystem, entry):
+        value, validators = fetch(cache.conditional_headers(entry))
+        entry = _store_versions(cache, key, entry, value, validators)
+    return _select_versions(entry['value'], latest, dual_values)
+
+
+def _store_versions(cache, key, entry, value, validators):
+    """Store fetched versions in the cache, return the entry to answer with."""
+    if value is _NOT_MODIFIED:
+        cache.revalidated(key, entry)
+        return entry
+    if validators is None:
+        # Answer with stale versions rather than with none when the registry fails.
+        return entry if entry is not None else {'value': value}
+    cache.set(key, value, **validators)
+    return {'value': value}
+
+
+def _check_response(package_name, headers, status_code):
+    """Get result of a fetch for response without versions, None for valid response."""
+    if status_code == 304 and headers:
+        return _NOT_MODIFIED, None
+    if status_code != 200:
+        _logger.info(
+            'Unable to fetch versions for package {pkg_name}'.format(pkg_name=package_name)
+        )
+        # Unknown packages are cached too, server errors are not.
+        return [], {} if status_code == 404 else None
+    return None
+
+
+def _get_validators(response_headers):
+    """Get validators of registry response to revalidate the cached versions with."""
+    return {'etag': response_headers.get('ETag'),
+            'last_modified': response_headers.get('Last-Modified')}
+
+
+def _npm_fetch_result(package_name, headers, status_code, load_json, response_headers):
+    """Turn npm registry response into result of a fetch, see `_cached_versions`."""
+    result = _check_response(package_name, headers, status_code)
+    if result is not None:
+        return result
+    response_json = {}
+    try:
+        response_json = load_json()
+    except ValueError:
+        pass
+    if not response_json:
+        return [], None
+    return _get_npm_versions(response_json, dual_values=True), _get_validators(response_headers)
+
+
+def _pypi_fetch_result(package_name, headers, status_code, load_json, response_headers):
+    """Turn PyPI response into result of a fetch, see `_cached_versions`."""
+    result = _check_response(package_name, headers, status_code)
+    if result is not None:
+        return result
+    return _get_pypi_versions(load_json(), dual_values=True), _get_validators(response_headers)
+
+
 def get_versions_for_golang_package(package_name, latest=False, dual_values=False):
     """Get all versions for given golang package.
 
@@ -98,15 +385,15 @@ def get_versions_for_golang_package(package_name, latest=False, dual_values=Fals
     :param dual_values: boolean value, to return both version list and latest version
     :return list, list of versions
     """
-    go_util = GolangUtils(package_name)
-    latest_ver = go_util.get_latest_version()
-    all_ver = go_util.get_all_versions()
-    if latest:
-        return latest_ver
-    if dual_values:
-        return {'versions': all_ver,
-                'latest_version': latest_ver}
-    return all_ver
+    def fetch(headers):
+        go_util = GolangUtils(package_name)
+        latest_ver = go_util.get_latest_version()
+        all_ver = go_util.get_all_versions()
+        # Failed scraping looks like an unknown package, neither of them is cached.
+        return {'versions': all_ver, 'latest_version': latest_ver}, \
+            {} if all_ver is not None else None
+
+    return _cached_versions('golang', package_name, latest, dual_values, fetch)
 
 
 def get_versions_for_npm_package(package_name, latest=False, dual_values=False):
@@ -117,26 +404,18 @@ def get_versions_for_npm_package(package_name, latest=False, dual_values=False):
     :param dual_values: boolean value, to return both version list and latest version
     :return list, list of versions
     """
-    url = 'https://registry.npmjs.org/{pkg_name}'.format(
-        pkg_name=package_name
-    )
+    url = _NPM_PACKAGE_URL.format(pkg_name=package_name)
 
-    response = requests.get(url)
+    def fetch(headers):
+        response = _http_get(url, headers)
+        return _npm_fetch_result(package_name, headers, response.status_code, response.json,
+                                 response.headers)
 
-    if response.status_code != 200:
-        _logger.info(
-            'Unable to fetch versions for package {pkg_name}'.format(pkg_name=package_name)
-        )
-        return []
+    return _cached_versions('npm', package_name, latest, dual_values, fetch)
 
-    response_json = {}
-    try:
-        response_json = response.json()
-    except ValueError:
-        pass
-    finally:
-        if not response_json:
-            return []
+
+def _get_npm_versions(response_json, latest=False, dual_values=False):
+    """Get versions from npm package document, see `get_versions_for_npm_package`."""
     ver_list = []
     if response_json.get('versions'):
         ver_list = list({x for x in response_json.get('versions', {})})
@@ -165,28 +444,29 @@ def get_versions_for_pypi_package(package_name, latest=False, dual_values=False)
     :param dual_values: boolean value, to return both version list and latest version
     :return list, list of versions
     """
-    pypi_package_url = 'https://pypi.python.org/pypi/{pkg_name}/json'.format(
-        pkg_name=package_name
-    )
+    pypi_package_url = _PYPI_PACKAGE_URL.format(pkg_name=package_name)
 
-    response = requests.get(pypi_package_url)
-    if response.status_code != 200:
-        _logger.info(
-            'Unable to fetch versions for package {pkg_name}'.format(pkg_name=package_name)
-        )
-        return []
+    def fetch(headers):
+        response = _http_get(pypi_package_url, headers)
+        return _pypi_fetch_result(package_name, headers, response.status_code, response.json,
+                                  response.headers)
+
+    return _cached_versions('pypi', package_name, latest, dual_values, fetch)
 
-    ver_list = list({x for x in response.json().get('releases', {})})
+
+def _get_pypi_versions(response_json, latest=False, dual_values=False):
+    """Get versions from PyPI package document, see `get_versions_for_pypi_package`."""
+    ver_list = list({x for x in response_json.get('releases', {})})
 
     if dual_values:
-        version = response.json().get('info', {})['version'] if \
-            'version' in response.json().get('info', {}) else select_latest_version(ver_list)
+        version = response_json.get('info', {})['version'] if \
+            'version' in response_json.get('info', {}) else select_latest_version(ver_list)
         return {'versions': ver_list,
                 'latest_version': version}
 
     if latest:
-        version = response.json().get('info', {})['version'] if \
-            'version' in response.json().get('info', {}) else select_latest_version(ver_list)
+        version = response_json.get('info', {})['version'] if \
+            'version' in response_json.get('info', {}) else select_latest_version(ver_list)
         return version
     return ver_list
 
@@ -201,8 +481,217 @@ def get_versions_for_maven_package(package_name, latest=False,
     :param multi_source: bool, fetch data from more than 1 source. applicable for maven
     :return list, list of versions
     """
+    def fetch(headers):
+        mvn_util = MavenUtils()
+        try:
+            versions, version, ok = mvn_util.fetch_versions(package_name, multi_source)
+        except ValueError:
+            # wrong package specification etc.
+            return [], {}
+        # Versions are cached only if some source answered.
+        return mvn_util.format_versions(versions, version, dual_values=True), \
+            {} if ok else None
+
+    return _cached_versions('maven', package_name, latest, dual_values, fetch,
+                            {'multi_source': True} if multi_source else None)
+
+
+def get_async_session():
+    """Return aiohttp session shared by all the asynchronous lookups of the event loop.
+
+    Its connection pool is bounded by `async_pool_size` connections in total and by
+    `host_concurrency` connections to a single host, see `configure_sessions`. Lookups
+    over the limits wait for a free connection, so any number of them can be in flight.
+    Must be called from a coroutine, returns None if aiohttp is not installed.
+    """
+    if aiohttp is None:
+        return None
+    loop = _get_running_loop()
+    session = _async_sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=_session_options['async_pool_size'],
+            limit_per_host=_session_options['host_concurrency'],
+            force_close=not _session_options['keep_alive'])
+        timeout = aiohttp.ClientTimeout(sock_connect=_session_options['connect_timeout'],
+                                        sock_read=_session_options['read_timeout'])
+        session = _async_sessions[loop] = aiohttp.ClientSession(connector=connector,
+                                                                timeout=timeout)
+    return session
+
+
+async def close_async_session():
+    """Close aiohttp session of the current event loop, if there is any."""
+    session = _async_sessions.pop(_get_running_loop(), None)
+    if session is not None:
+        await session.close()
+
+
+async def _async_http_get(url, headers=None):
+    """Send GET request to the url, return status code, body and headers of the response.
+
+    Without aiohttp the request is sent by `_http_get` in the default executor.
+    Raises OSError (or asyncio.TimeoutError) if the request fails.
+    """
+    session = get_async_session()
+    if session is None:
+        response = await _get_running_loop().run_in_executor(
+            None, _http_get, url, headers)
+        return response.status_code, response.content, response.headers
+    try:
+        async with session.get(url, headers=headers or None) as response:
+            return response.status, await response.read(), response.headers
+    except aiohttp.ClientError as e:
+        raise OSError(str(e)) from e
+
+
+def _load_json(body):
+    """Decode JSON body of a response."""
+    return json.loads(body.decode('utf-8'))
+
+
+async def _async_cached_versions(ecosystem, package_name, latest, dual_values, fetch,
+                                 options=None):
+    """Look up versions of a package through the version cache, see `_cached_versions`.
+
+    The cache is read and written in the default executor, its on-disk backend
+    may wait for a lock held by other processes.
+
+    :param fetch: coroutine function, see `_cached_versions`
+    """
+    cache = _version_cache
+    if cache is None:
+        return _select_versions((await fetch({}))[0], latest, dual_values)
+    loop = _get_running_loop()
+    key = cache.make_key(ecosystem, package_name, options)
+    entry = await loop.run_in_executor(None, cache.get, key)
+    if entry is None or not cache.is_fresh(ecosystem, entry):
+        value, validators = await fetch(cache.conditional_headers(entry))
+        entry = await loop.run_in_executor(None, _store_versions, cache, key, entry, value,
+                                           validators)
+    return _select_versions(entry['value'], latest, dual_values)
+
+
+async def async_get_versions_and_latest_for_ep(ecosystem, package_name, multi_source=False):
+    """Get all versions and the latest version, see `get_versions_and_latest_for_ep`."""
+    return await _async_get_versions(ecosystem, package_name, False, True, multi_source)
+
+
+async def async_get_versions_for_ep(ecosystem, package_name, multi_source=False):
+    """Get all versions for given (ecosystem, package), see `get_versions_for_ep`."""
+    return await _async_get_versions(ecosystem, package_name, False, False, multi_source)
+
+
+async def async_get_latest_versions_for_ep(ecosystem, package_name, multi_source=False):
+    """Get the latest version for given (ecosystem, package), see `get_latest_versions_for_ep`."""
+    return await _async_get_versions(ecosystem, package_name, True, False, multi_source)
+
+
+async def _async_get_versions(ecosystem, package_name, latest, dual_values, multi_source):
+    """Dispatch asynchronous lookup to the ecosystem."""
+    if package_name is None:
+        raise ValueError('Package name is not provided')
+
+    if ecosystem == 'npm':
+        return await async_get_versions_for_npm_package(package_name, latest, dual_values)
+    if ecosystem == 'pypi':
+        return await async_get_versions_for_pypi_package(package_name, latest, dual_values)
+    if ecosystem == 'maven':
+        return await async_get_versions_for_maven_package(package_name, latest, dual_values,
+                                                          multi_source)
+    if ecosystem == 'golang':
+        return await async_get_versions_for_golang_package(package_name, latest, dual_values)
+    raise ValueError('Unsupported ecosystem: {e}'.format(e=ecosystem))
+
+
+async def async_get_versions_for_npm_package(package_name, latest=False, dual_values=False):
+    """Get all versions for given NPM package, see `get_versions_for_npm_package`."""
+    url = _NPM_PACKAGE_URL.format(pkg_name=package_name)
+
+    async def fetch(headers):
+        status, body, response_headers = await _async_http_get(url, headers)
+        return _npm_fetch_result(package_name, headers, status, partial(_load_json, body),
+                                 response_headers)
+
+    return await _async_cached_versions('npm', package_name, latest, dual_values, fetch)
+
+
+async def async_get_versions_for_pypi_package(package_name, latest=False, dual_values=False):
+    """Get all versions for given PyPI package, see `get_versions_for_pypi_package`."""
+    url = _PYPI_PACKAGE_URL.format(pkg_name=package_name)
+
+    async def fetch(headers):
+        status, body, response_headers = await _async_http_get(url, headers)
+        return _pypi_fetch_result(package_name, headers, status, partial(_load_json, body),
+                                  response_headers)
+
+    return await _async_cached_versions('pypi', package_name, latest, dual_values, fetch)
+
+
+async def async_get_versions_for_maven_package(package_name, latest=False,
+                                               dual_values=False, multi_source=False):
+    """Get all versions for given package from Maven Central.
+
+    Metadata files are fetched concurrently, mvnrepository (`multi_source`) is scraped
+    in the default executor. See `get_versions_for_maven_package`.
+    """
+    return await _async_cached_versions(
+        'maven', package_name, latest, dual_values,
+        partial(_async_fetch_maven_versions, package_name, multi_source),
+        {'multi_source': True} if multi_source else None)
+
+
+async def _async_fetch_maven_versions(package_name, multi_source, headers):
+    """Fetch versions of Maven package, see `_cached_versions`."""
     mvn_util = MavenUtils()
-    return mvn_util.get_versions_for_maven_package(package_name, latest, dual_values, multi_source)
+    try:
+        urls = mvn_util.metadata_urls(package_name)
+    except ValueError:
+        # wrong package specification etc.
+        return [], {}
+    versions = set()
+    version = ""
+    ok = False
+    responses = await asyncio.gather(*[_async_http_get(url) for url in urls],
+                                     return_exceptions=True)
+    for response in responses:
+        if isinstance(response, (OSError, asyncio.TimeoutError)):
+            continue
+        if isinstance(response, BaseException):
+            raise response
+        status, body, _ = response
+        if status != 200:
+            continue
+        try:
+            listed, version = mvn_util.parse_metadata(etree.fromstring(body))
+        except etree.XMLSyntaxError:
+            continue
+        ok = True
+        versions = versions.union(listed)
+
+    if not ok and multi_source:
+        try:
+            versions = await _get_running_loop().run_in_executor(
+                None, mvn_util.get_versions_from_other_source, package_name)
+            ok = True
+        except Exception:
+            pass
+
+    if not ok:
+        _logger.info(
+            'Unable to fetch versions for package {pkg_name}'.format(pkg_name=package_name)
+        )
+    return mvn_util.format_versions(versions, version, dual_values=True), {} if ok else None
+
+
+async def async_get_versions_for_golang_package(package_name, latest=False, dual_values=False):
+    """Get all versions for given golang package, see `get_versions_for_golang_package`.
+
+    Go module pages are scraped in the default executor; cancelling the lookup
+    does not stop the scraping already started.
+    """
+    return await _get_running_loop().run_in_executor(
+        None, partial(get_versions_for_golang_package, package_name, latest, dual_values))
 
 
 def select_latest_version(versions=[]):
@@ -0,0 +1,47 @@
+"""Fixtures shared by the tests of dependency tree generators."""
+
+from pathlib import Path
+
+import pytest
+
+# Manifest fixtures of the ecosystems, paths are relative to the tests directory.
+ECOSYSTEM_MANIFESTS = [
+    ("maven", "data/dependencies.txt"),
+    ("golang", "data/gograph.txt"),
+    ("npm", "data/npmlist.json"),
+    ("npm", "data/package-lock.json"),
+    ("pypi", "data/pylist.json"),
+]
+
+
+def pytest_configure(config):
+    """Register the marker selecting ecosystems of the manifest fixtures."""
+    config.addinivalue_line(
+        "markers", "ecosystems(*names): run only with manifest fixtures of these ecosystems")
+
+
+def pytest_generate_tests(metafunc):
+    """Run tests taking `ecosystem` and `filename` once per manifest fixture.
+
+    Tests marked with `ecosystems` get the manifests of the listed ecosystems only,
+    tests parametrizing `filename` themselves are left alone.
+    """
+    if not {"ecosystem", "filename"} <= set(metafunc.fixturenames):
+        return
+    if any("filename" in str(mark.args[0])
+           for mark in metafunc.definition.iter_markers("parametrize")):
+        return
+    marker = metafunc.definition.get_closest_marker("ecosystems")
+    metafunc.parametrize("ecosystem, filename", [
+        (ecosystem, filename) for ecosystem, filename in ECOSYSTEM_MANIFESTS
+        if marker is None or ecosystem in marker.args])
+
+
+@pytest.fixture
+def load_manifests():
+    """Return a function loading a manifest fixture `count` times, under different paths."""
+    def load(filename, count=1):
+        content = (Path(__file__).parent / filename).read_text()
+        return [{"filename": filename, "filepath": "/bin/local/%d" % i, "content": content}
+                for i in range(count)]
+    return load
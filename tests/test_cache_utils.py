@@ -0,0 +1,147 @@
+"""Tests for classes from cache_utils module."""
+
+import pickle
+import sqlite3
+from multiprocessing import Pool
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from f8a_utils.cache_utils import MemoryCacheBackend, SqliteCacheBackend, TreeCache, \
+    VersionCache
+
+
+def _store_in_sqlite(args):
+    """Store value into sqlite cache from another process."""
+    backend, key = args
+    backend.set(key, key.encode('utf-8'))
+    return backend.get(key)
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def backend(request, tmp_path):
+    """Create empty backend limited to 100 bytes."""
+    if request.param == 'memory':
+        return MemoryCacheBackend(max_bytes=100)
+    return SqliteCacheBackend(tmp_path / 'cache.db', max_bytes=100, access_interval=0)
+
+
+def test_backend_lru_eviction(backend):
+    """Test that least recently used entries are evicted first."""
+    backend.set('a', b'x' * 29)
+    backend.set('b', b'x' * 29)
+    backend.set('c', b'x' * 29)
+    assert backend.size_bytes == 90
+    assert backend.get('a') == b'x' * 29
+    backend.set('d', b'x' * 29)
+    assert backend.get('b') is None
+    assert backend.get('a') is not None
+    assert len(backend) == 3
+    backend.set('too-big', b'x' * 100)
+    assert backend.get('too-big') is None
+    backend.delete('a')
+    assert backend.get('a') is None
+    backend.clear()
+    assert len(backend) == 0
+    assert backend.size_bytes == 0
+
+
+def test_sqlite_backend_shared_by_processes(tmp_path):
+    """Test that sqlite backend can be used by several processes at once."""
+    backend = SqliteCacheBackend(tmp_path / 'cache.db')
+    keys = ['key{}'.format(i) for i in range(8)]
+    with Pool(4) as pool:
+        values = pool.map(_store_in_sqlite, [(backend, key) for key in keys])
+    assert values == [key.encode('utf-8') for key in keys]
+    assert len(pickle.loads(pickle.dumps(backend))) == 8
+
+
+def test_sqlite_backend_read_only_hits(tmp_path):
+    """Test that hits do not wait for writers, unless the access time gets old."""
+    path = tmp_path / 'cache.db'
+    backend = SqliteCacheBackend(path, max_bytes=100, timeout=0.1, access_interval=60)
+    with patch("f8a_utils.cache_utils.time.time", return_value=1000):
+        backend.set('a', b'x' * 29)
+        backend.set('a', b'x' * 19)
+        backend.set('b', b'x' * 29)
+    assert backend.size_bytes == 50
+    writer = sqlite3.connect(str(path), isolation_level=None)
+    writer.execute('BEGIN IMMEDIATE')
+    with patch("f8a_utils.cache_utils.time.time", return_value=1060):
+        assert backend.get('a') == b'x' * 19
+    with patch("f8a_utils.cache_utils.time.time", return_value=1061):
+        with pytest.raises(sqlite3.OperationalError):
+            backend.get('a')
+    writer.execute('ROLLBACK')
+    with patch("f8a_utils.cache_utils.time.time", return_value=1061):
+        assert backend.get('a') == b'x' * 19
+        backend.set('c', b'x' * 59)
+    assert backend.get('b') is None
+    assert backend.size_bytes == 80
+    assert SqliteCacheBackend(path).size_bytes == 80
+
+
+def test_tree_cache_key():
+    """Test that cache key depends on content and options only."""
+    path = Path(__file__).parent / "data/dependencies.txt"
+    key = TreeCache.make_key("maven", True, path)
+    assert key == TreeCache.make_key("maven", True, path.read_bytes())
+    assert key == TreeCache.make_key("maven", True, path.read_text())
+    assert key != TreeCache.make_key("maven", False, path)
+    assert key != TreeCache.make_key("npm", True, path)
+    assert key != TreeCache.make_key("maven", True, path, {"max_nodes": 1})
+    with open(str(path)) as fd:
+        assert TreeCache.make_key("maven", True, fd) is None
+
+
+def test_tree_cache_stats():
+    """Test hit and miss accounting of the tree cache."""
+    cache = TreeCache()
+    assert cache.get('key') is None
+    cache.set('key', [{"package": "a", "version": "1", "deps": []}])
+    assert cache.get('key') == [{"package": "a", "version": "1", "deps": []}]
+    assert cache.get('key') is not cache.get('key')
+    stats = cache.stats()
+    assert stats['hits'] == 3
+    assert stats['misses'] == 1
+    assert stats['entries'] == 1
+    assert stats['size_bytes'] > 0
+
+
+def test_version_cache():
+    """Test freshness and validators of cached versions."""
+    cache = VersionCache(ttl={'npm': 10})
+    key = cache.make_key("npm", "lodash")
+    assert key != cache.make_key("pypi", "lodash")
+    assert key != cache.make_key("npm", "lodash", {"multi_source": True})
+    assert cache.get(key) is None
+    assert cache.conditional_headers(None) == {}
+
+    with patch("f8a_utils.cache_utils.time.time", return_value=1000):
+        cache.set(key, ["1.0.0"], etag='"abc"')
+    entry = cache.get(key)
+    assert entry['value'] == ["1.0.0"]
+    assert cache.conditional_headers(entry) == {'If-None-Match': '"abc"'}
+    with patch("f8a_utils.cache_utils.time.time", return_value=1009):
+        assert cache.is_fresh("npm", entry)
+        assert not cache.is_fresh("maven", {'stored': 1000 - 60 * 60})
+    with patch("f8a_utils.cache_utils.time.time", return_value=1010):
+        assert not cache.is_fresh("npm", entry)
+        cache.revalidated(key, entry)
+    assert cache.get(key)['stored'] == 1010
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['revalidations']) == (2, 1, 1)
+    assert stats['entries'] == 1
+
+
+def test_version_cache_backend_failure():
+    """Test that failing backend is handled as cache miss."""
+    backend = MemoryCacheBackend()
+    cache = VersionCache(backend)
+    error = sqlite3.OperationalError('database is locked')
+    with patch.object(backend, 'get', side_effect=error), \
+            patch.object(backend, 'set', side_effect=error):
+        cache.set('key', ['1.0.0'])
+        assert cache.get('key') is None
+    assert cache.stats()['misses'] == 1
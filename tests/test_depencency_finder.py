@@ -1,12 +1,25 @@
 """Tests for classes from depencency_finder module."""
+import io
+import itertools
 import json
+import subprocess
+import sys
 import unittest
+from unittest.mock import patch
 
-from f8a_utils.dependency_finder import DependencyFinder
+from f8a_utils.cache_utils import TreeCache
+from f8a_utils import dependency_finder
+from f8a_utils.dependency_finder import DependencyFinder, get_dependency_tree_generator, \
+    get_tree_generator, register_ecosystem
 from pathlib import Path
 import pytest
 
-from f8a_utils.tree_generator import GolangDependencyTreeGenerator, MavenDependencyTreeGenerator
+from f8a_utils.tree_generator import GolangDependencyTreeGenerator, MavenDependencyTreeGenerator, \
+    NpmDependencyTreeGenerator, PypiDependencyTreeGenerator, LazyDependencies, ExpansionBudget, \
+    expand_shared_nodes
+from f8a_utils.manifest_reader import JsonStream, iter_lines, iter_text_chunks
+from f8a_utils.tree_expansion import walk_graph
+from f8a_utils.dependency_graph import DependencyGraph
 
 
 def test_scan_and_find_dependencies_npm():
@@ -239,6 +252,598 @@ def test_scan_and_find_dependencies_maven_ignore_test_deps():
         assert package['package'] not in test_packages
 
 
+def test_scan_and_find_dependencies_maven_streamed_content():
+    """Test that Maven dependency.txt can be passed as a path or a file object."""
+    path = Path(__file__).parent / "data/dependencies.txt"
+    manifests = [{
+        "filename": "dependencies.txt",
+        "filepath": "/bin/local",
+        "content": path.read_bytes()
+    }]
+    expected = DependencyFinder().scan_and_find_dependencies("maven", manifests, True)
+
+    manifests[0]["content"] = path
+    res = DependencyFinder().scan_and_find_dependencies("maven", manifests, True)
+    assert res == expected
+
+    with open(str(path), "rb") as fd:
+        manifests[0]["content"] = fd
+        res = DependencyFinder().scan_and_find_dependencies("maven", manifests, True)
+    assert res == expected
+
+
+def test_iter_lines():
+    """Test lazy line iteration over various manifest content types."""
+    assert list(iter_lines("a\nb\r\n\nc")) == ["a", "b", "", "c"]
+    assert list(iter_lines(b"a\nb\r\n")) == ["a", "b"]
+    assert list(iter_lines(io.StringIO("a\nb"))) == ["a", "b"]
+    assert list(iter_lines(Path(__file__).parent / "data/gograph_empty.txt")) == []
+
+
+def test_scan_and_find_dependencies_maven_shared_and_cyclic_subtrees():
+    """Test Maven transitives for subtrees shared by directs and dependency cycles."""
+    content = '''digraph "g:root:jar:1.0" {
+    "g:root:jar:1.0" -> "g:a:jar:1:compile" ;
+    "g:root:jar:1.0" -> "g:b:jar:1:compile" ;
+    "g:a:jar:1:compile" -> "g:common:jar:1:compile" ;
+    "g:b:jar:1:compile" -> "g:common:jar:1:compile" ;
+    "g:common:jar:1:compile" -> "g:x:jar:1:compile" ;
+    "g:x:jar:1:compile" -> "g:common:jar:1:compile" ;
+ } '''
+    manifests = [{"filename": "dependencies.txt", "filepath": "/bin/local", "content": content}]
+    res = DependencyFinder().scan_and_find_dependencies("maven", manifests, True)
+    resolved = res['result'][0]['details'][0]['_resolved']
+    expected_deps = [{"package": "g:common", "version": "1"}, {"package": "g:x", "version": "1"}]
+    assert [r['package'] for r in resolved] == ['g:a', 'g:b']
+    assert resolved[0]['deps'] == expected_deps
+    assert resolved[1]['deps'] == expected_deps
+
+
+def test_scan_and_find_dependencies_golang_deep_and_cyclic_graph():
+    """Test golang transitives for very deep graph with a dependency cycle."""
+    depth = 5000
+    lines = ["github.com/root/mod github.com/pkg/p0@v1.0.0"]
+    lines.extend("github.com/pkg/p{}@v1.0.0 github.com/pkg/p{}@v1.0.0".format(i, i + 1)
+                 for i in range(depth))
+    lines.append("github.com/pkg/p{}@v1.0.0 github.com/pkg/p1@v1.0.0".format(depth))
+    manifests = [{
+        "filename": "gograph.txt",
+        "filepath": "/bin/local",
+        "content": "\n".join(lines) + "\n"
+    }]
+    res = DependencyFinder().scan_and_find_dependencies("golang", manifests, True)
+    resolved = res['result'][0]['details'][0]['_resolved']
+    assert len(resolved) == 1
+    assert resolved[0]['package'] == "github.com/pkg/p0"
+    assert len(resolved[0]['deps']) == depth
+    assert resolved[0]['deps'][0]['package'] == "github.com/pkg/p1"
+
+
+def test_scan_and_find_dependencies_npm_lockfile():
+    """Test scan_and_find_dependencies function for NPM package-lock.json v3."""
+    manifests = [{
+        "filename": "package-lock.json",
+        "filepath": "/bin/local",
+        "content": open(str(Path(__file__).parent / "data/package-lock.json")).read()
+    }]
+    res = DependencyFinder().scan_and_find_dependencies("npm", manifests, True)
+    resolved = res['result'][0]['details'][0]['_resolved']
+    assert [(r['package'], r['version']) for r in resolved] == [
+        ("body-parser", "1.18.2"), ("debug", "3.2.7")]
+    assert resolved[0]['deps'] == [
+        {"package": "debug", "version": "2.6.9"},
+        {"package": "ms", "version": "2.1.3"},
+        {"package": "cycle-a", "version": "1.0.0"},
+        {"package": "cycle-b", "version": "1.0.0"}]
+    assert resolved[1]['deps'] == [{"package": "ms", "version": "2.1.3"}]
+
+
+def test_npm_parse_transitives_limits():
+    """Test dedup, depth and node limits of the npm transitive walker."""
+    leaf = {"version": "1.0.0"}
+    content = {
+        "a": {"version": "1.0.0", "dependencies": {"b": {"version": "1.0.0",
+                                                         "dependencies": {"c": leaf}}}},
+        "c": leaf,
+        "d": {"missing": True, "required": "^1.0.0"}
+    }
+    walker = NpmDependencyTreeGenerator()
+    packages = [d['package'] for d in walker._parse_transitives(content)]
+    assert packages == ['a', 'b', 'c', 'c']
+    packages = [d['package'] for d in walker._parse_transitives(content, dedup=True)]
+    assert packages == ['a', 'b', 'c']
+    packages = [d['package'] for d in walker._parse_transitives(content, max_depth=1)]
+    assert packages == ['a', 'c']
+    packages = [d['package'] for d in walker._parse_transitives(content, max_nodes=2)]
+    assert packages == ['a', 'b']
+
+
+def test_npm_parse_transitives_deep_tree():
+    """Test that very deep npm trees do not hit the recursion limit."""
+    content = {}
+    level = content
+    for i in range(5000):
+        level["pkg{}".format(i)] = {"version": "1.0.0", "dependencies": {}}
+        level = level["pkg{}".format(i)]["dependencies"]
+    transitive = NpmDependencyTreeGenerator()._parse_transitives(content)
+    assert len(transitive) == 5000
+
+
+def test_scan_and_find_dependencies_compact():
+    """Test compact result of scan_and_find_dependencies for several manifests."""
+    content = open(str(Path(__file__).parent / "data/npmlist.json")).read()
+    manifests = [{
+        "filename": "npmlist.json",
+        "filepath": "/bin/local/{}".format(i),
+        "content": content
+    } for i in range(3)]
+    legacy = DependencyFinder().scan_and_find_dependencies("npm", manifests, True)
+    assert len(legacy['result']) == 3
+    assert len(legacy['result'][0]['details']) == 3
+
+    res = DependencyFinder().scan_and_find_dependencies("npm", manifests, True, compact=True)
+    assert len(res['result']) == 1
+    details = res['result'][0]['details']
+    assert details == legacy['result'][0]['details']
+    assert [d['manifest_file_path'] for d in details] == \
+        ["/bin/local/0", "/bin/local/1", "/bin/local/2"]
+    first_deps = details[0]['_resolved'][0]['deps']
+    last_deps = details[2]['_resolved'][0]['deps']
+    assert all(a is b for a, b in zip(first_deps, last_deps))
+
+    res = DependencyFinder().scan_and_find_dependencies("golang", [{
+        "filename": "gograph.txt",
+        "filepath": "/bin/local",
+        "content": open(str(Path(__file__).parent / "data/gograph.txt")).read()
+    }], True, compact=True)
+    with open(str(Path(__file__).parent / "data/golang_dep_tree.json")) as fp:
+        assert res == json.load(fp)
+
+
+def test_parse_coordinates_cached():
+    """Test that parsed coordinates are cached and converted to dicts on demand."""
+    coordinates = MavenDependencyTreeGenerator._parse_coordinates(
+        "io.vertx:vertx-web:jar:3.5.4:compile")
+    assert coordinates is MavenDependencyTreeGenerator._parse_coordinates(
+        "io.vertx:vertx-web:jar:3.5.4:compile")
+    assert coordinates.package == "io.vertx:vertx-web"
+    assert coordinates.scope == "compile"
+    assert coordinates.to_record() == {"package": "io.vertx:vertx-web", "version": "3.5.4"}
+    assert coordinates.to_dict() == MavenDependencyTreeGenerator._parse_string(
+        "io.vertx:vertx-web:jar:3.5.4:compile")
+    assert coordinates.to_record() is not coordinates.to_record()
+
+    coordinates = GolangDependencyTreeGenerator._parse_coordinates(
+        "github.com/hashicorp/consul/sdk@v0.1.1")
+    assert coordinates.package == "github.com/hashicorp/consul/sdk"
+    assert coordinates.version == "0.1.1"
+    assert coordinates.to_dict()['from'] == "github.com/hashicorp/consul/sdk@v0.1.1"
+    with pytest.raises(ValueError):
+        MavenDependencyTreeGenerator._parse_coordinates("a:b:c:d:e:f:g")
+
+
+def test_scan_and_find_dependencies_parallel():
+    """Test scanning of manifests in worker processes."""
+    manifests = [{
+        "filename": "dependencies.txt",
+        "filepath": "/bin/local/{}".format(i),
+        "content": open(str(Path(__file__).parent / name)).read()
+    } for i, name in enumerate(["data/dependencies.txt", "data/dependencies_various_ncols.txt",
+                                "data/dependencies.txt"])]
+    expected = DependencyFinder().scan_and_find_dependencies("maven", manifests, True)
+    res = DependencyFinder().scan_and_find_dependencies("maven", manifests, True, workers=2,
+                                                        parallel_threshold=0)
+    assert res == expected
+    assert [d['manifest_file_path'] for d in res['result'][0]['details']] == \
+        ["/bin/local/0", "/bin/local/1", "/bin/local/2"]
+
+
+def test_should_scan_in_parallel():
+    """Test the decision whether to scan manifests in worker processes."""
+    should_scan = MavenDependencyTreeGenerator._should_scan_in_parallel
+    manifests = [{"content": "x" * 10}, {"content": b"x" * 10}]
+    assert should_scan(manifests, 2, 20)
+    assert not should_scan(manifests, 2, 21)
+    assert not should_scan(manifests, None, 0)
+    assert not should_scan(manifests, 1, 0)
+    assert not should_scan(manifests[:1], 4, 0)
+    assert not should_scan(manifests + [{"content": io.StringIO("x")}], 2, 0)
+    path = Path(__file__).parent / "data/dependencies.txt"
+    assert should_scan([{"content": path}, {"content": path}], 2, 2 * path.stat().st_size)
+
+
+def test_scan_and_find_dependencies_cached():
+    """Test that manifests with the same content are resolved only once."""
+    content = open(str(Path(__file__).parent / "data/npmlist.json")).read()
+    manifests = [{
+        "filename": "npmlist.json",
+        "filepath": "/bin/local/{}".format(i),
+        "content": content
+    } for i in range(2)]
+    expected = DependencyFinder().scan_and_find_dependencies("npm", manifests, True)
+    cache = TreeCache()
+    res = DependencyFinder().scan_and_find_dependencies("npm", manifests, True, cache=cache)
+    assert res == expected
+    assert (cache.hits, cache.misses) == (0, 2)
+    res = DependencyFinder().scan_and_find_dependencies("npm", manifests, True, cache=cache)
+    assert res == expected
+    assert (cache.hits, cache.misses) == (2, 2)
+    DependencyFinder().scan_and_find_dependencies("npm", manifests, False, cache=cache)
+    assert (cache.hits, cache.misses) == (2, 4)
+
+
+def test_diff_dependencies():
+    """Test diff of dependencies between two revisions of go mod graph."""
+    previous = {
+        "filename": "gograph.txt",
+        "filepath": "/bin/local",
+        "content": "github.com/root/mod github.com/a/a@v1.0.0\n"
+                   "github.com/root/mod github.com/b/b@v1.0.0\n"
+                   "github.com/a/a@v1.0.0 github.com/c/c@v1.0.0\n"
+                   "github.com/b/b@v1.0.0 github.com/d/d@v1.0.0\n"
+    }
+    current = dict(previous, content="github.com/root/mod github.com/a/a@v1.1.0\n"
+                                     "github.com/root/mod github.com/e/e@v1.0.0\n"
+                                     "github.com/a/a@v1.1.0 github.com/c/c@v1.2.0\n")
+    cache = TreeCache()
+    diff = DependencyFinder().diff_dependencies("golang", previous, current, cache=cache)
+    assert diff["direct"] == {
+        "added": [{"package": "github.com/e/e", "version": "1.0.0"}],
+        "removed": [{"package": "github.com/b/b", "version": "1.0.0"}],
+        "changed": [{"package": "github.com/a/a", "previous_versions": ["1.0.0"],
+                     "versions": ["1.1.0"]}]
+    }
+    assert diff["transitive"] == {
+        "added": [],
+        "removed": [{"package": "github.com/d/d", "version": "1.0.0"}],
+        "changed": [{"package": "github.com/c/c", "previous_versions": ["1.0.0"],
+                     "versions": ["1.2.0"]}]
+    }
+    assert cache.misses == 2
+
+    DependencyFinder().diff_dependencies("golang", current, previous, cache=cache)
+    assert cache.hits == 2
+
+    diff = DependencyFinder().diff_dependencies("golang", previous, dict(previous))
+    assert diff["direct"] == {"added": [], "removed": [], "changed": []}
+    assert diff["transitive"] == {"added": [], "removed": [], "changed": []}
+
+    with patch.object(dependency_finder, "_diff_cache", TreeCache()) as shared:
+        DependencyFinder().diff_dependencies("golang", previous, current)
+        DependencyFinder().diff_dependencies("golang", current, previous)
+        assert (shared.hits, shared.misses) == (2, 2)
+
+
+def test_get_dependencies_lazy(ecosystem, filename, load_manifests):
+    """Test that lazy transitive deps are resolved on first access only."""
+    manifests = load_manifests(filename)
+    expected = DependencyFinder().scan_and_find_dependencies(ecosystem, manifests, True)
+    generator = get_dependency_tree_generator(ecosystem)()
+    res = generator.get_dependencies(manifests, True, lazy=True)
+    lazy_deps = [r['deps'] for r in res['result'][0]['details'][0]['_resolved']
+                 if isinstance(r['deps'], LazyDependencies)]
+    if ecosystem != "pypi":
+        assert lazy_deps
+    assert not any(deps.resolved for deps in lazy_deps)
+    assert json.loads(json.dumps(res, default=list)) == expected
+    assert all(deps.resolved for deps in lazy_deps)
+    assert res == expected
+
+
+def test_scan_and_find_dependencies_reverse_index():
+    """Test reverse index of transitive deps built with the tree."""
+    content = ('digraph "g:module:jar:1" {\n'
+               '\t"g:module:jar:1" -> "g:a:jar:1:compile" ;\n'
+               '\t"g:module:jar:1" -> "g:b:jar:1:compile" ;\n'
+               '\t"g:a:jar:1:compile" -> "g:c:jar:1:compile" ;\n'
+               '\t"g:c:jar:1:compile" -> "g:vuln:jar:2:compile" ;\n'
+               '\t"g:b:jar:1:compile" -> "g:vuln:jar:2:compile" ;\n'
+               '}\n')
+    manifests = [{"filename": "dependencies.txt", "filepath": "/bin/local", "content": content}]
+    res = DependencyFinder().scan_and_find_dependencies("maven", manifests, True,
+                                                        reverse_index=True)
+    index = res['result'][0]['details'][0]['_reverse_index']
+    assert index["g:vuln"]["2"] == [
+        {"package": "g:a", "version": "1",
+         "path": [{"package": "g:a", "version": "1"}, {"package": "g:c", "version": "1"},
+                  {"package": "g:vuln", "version": "2"}]},
+        {"package": "g:b", "version": "1",
+         "path": [{"package": "g:b", "version": "1"}, {"package": "g:vuln", "version": "2"}]}]
+    assert sorted(index) == ["g:c", "g:vuln"]
+    res = DependencyFinder().scan_and_find_dependencies("maven", manifests, True)
+    assert '_reverse_index' not in res['result'][0]['details'][0]
+
+
+@pytest.mark.parametrize("ecosystem, filename, options", [
+    ("maven", "data/dependencies.txt", {}),
+    ("golang", "data/gograph.txt", {}),
+    ("npm", "data/npmlist.json", {}),
+    ("npm", "data/package-lock.json", {}),
+    ("npm", "data/package-lock.json", {"max_depth": 1}),
+    ("npm", "data/package-lock.json", {"dedup": True}),
+    ("pypi", "data/pylist.json", {}),
+])
+def test_get_dependencies_reverse_index(ecosystem, filename, options):
+    """Test that every transitive dep leads back to its direct deps through the index."""
+    manifests = [{
+        "filename": filename,
+        "filepath": "/bin/local",
+        "content": open(str(Path(__file__).parent / filename)).read()
+    }]
+    generator = get_dependency_tree_generator(ecosystem)()
+    cache = TreeCache()
+    res = generator.get_dependencies(manifests, True, cache=cache, lazy=True,
+                                     reverse_index=True, **options)
+    details = res['result'][0]['details'][0]
+    index = details['_reverse_index']
+    for direct in details['_resolved']:
+        for record in direct['deps']:
+            entries = [entry for entry in index[record['package']][record['version']]
+                       if entry['package'] == direct['package']]
+            assert len(entries) == 1
+            path = entries[0]['path']
+            assert (path[0]['package'], path[0]['version']) == \
+                (direct['package'], direct['version'])
+            assert path[-1] == record
+    cached = generator.get_dependencies(manifests, True, cache=cache, reverse_index=True,
+                                        **options)
+    # Results cut by a limit are not cached.
+    assert cache.hits == (0 if details.get('truncated') else 1)
+    assert json.loads(json.dumps(cached)) == json.loads(json.dumps(res))
+
+
+def test_scan_and_find_dependencies_golang_mvs():
+    """Test that golang modules are collapsed to versions selected by MVS."""
+    content = ('example.com/main example.com/a@v1.0.0\n'
+               'example.com/main example.com/b@v1.0.0\n'
+               'example.com/main example.com/c@v1.1.0\n'
+               'example.com/a@v1.0.0 example.com/c@v1.2.0\n'
+               'example.com/b@v1.0.0 example.com/c@v1.0.0\n'
+               'example.com/b@v1.0.0 example.com/a@v1.1.0\n'
+               'example.com/a@v1.1.0 example.com/d@v0.1.0\n'
+               'example.com/c@v1.2.0 example.com/d@v0.2.0\n')
+    manifests = [{"filename": "gograph.txt", "filepath": "/bin/local", "content": content}]
+    res = DependencyFinder().scan_and_find_dependencies("golang", manifests, True, mvs=True)
+    resolved = res['result'][0]['details'][0]['_resolved']
+    assert [(r['package'], r['version'], [(d['package'], d['version']) for d in r['deps']])
+            for r in resolved] == [
+        ("example.com/a", "1.1.0", [("example.com/d", "0.2.0")]),
+        ("example.com/b", "1.0.0", [("example.com/c", "1.2.0"), ("example.com/a", "1.1.0"),
+                                    ("example.com/d", "0.2.0")]),
+        ("example.com/c", "1.2.0", [("example.com/d", "0.2.0")])]
+    res = DependencyFinder().scan_and_find_dependencies("golang", manifests, True,
+                                                        mvs=True, reverse_index=True)
+    index = res['result'][0]['details'][0]['_reverse_index']
+    assert [entry['package'] for entry in index["example.com/d"]["0.2.0"]] == \
+        ["example.com/a", "example.com/b", "example.com/c"]
+    assert [d['version'] for d in index["example.com/c"]["1.2.0"][0]['path']] == \
+        ["1.0.0", "1.2.0"]
+
+    # Paths go through the required versions, not the selected ones.
+    manifests[0]["content"] = ('example.com/main example.com/a@v1.0.0\n'
+                               'example.com/main example.com/c@v1.2.0\n'
+                               'example.com/a@v1.0.0 example.com/c@v1.1.0\n'
+                               'example.com/c@v1.1.0 example.com/d@v1.0.0\n')
+    res = DependencyFinder().scan_and_find_dependencies("golang", manifests, True,
+                                                        mvs=True, reverse_index=True)
+    index = res['result'][0]['details'][0]['_reverse_index']
+    assert [(d['package'], d['version']) for d in index["example.com/d"]["1.0.0"][0]['path']] == \
+        [("example.com/a", "1.0.0"), ("example.com/c", "1.1.0"), ("example.com/d", "1.0.0")]
+    assert [(d['package'], d['version']) for d in index["example.com/c"]["1.2.0"][0]['path']] == \
+        [("example.com/a", "1.0.0"), ("example.com/c", "1.2.0")]
+
+
+@pytest.mark.ecosystems("maven", "golang", "npm")
+def test_scan_and_find_dependencies_limits(ecosystem, filename, load_manifests):
+    """Test node, depth and time limits of transitive expansion."""
+    manifests = load_manifests(filename)
+    finder = DependencyFinder()
+    full = finder.scan_and_find_dependencies(ecosystem, manifests, True)
+    details = full['result'][0]['details'][0]
+    total = sum(len(r['deps']) for r in details['_resolved'])
+    assert 'truncated' not in details
+
+    res = finder.scan_and_find_dependencies(ecosystem, manifests, True, max_nodes=total)
+    assert res == full
+    res = finder.scan_and_find_dependencies(ecosystem, manifests, True, max_nodes=total - 1)
+    details = res['result'][0]['details'][0]
+    assert details['truncated'] is True
+    assert sum(len(r['deps']) for r in details['_resolved']) == total - 1
+
+    res = finder.scan_and_find_dependencies(ecosystem, manifests, True, max_depth=1)
+    details = res['result'][0]['details'][0]
+    assert details['truncated'] is True
+    assert sum(len(r['deps']) for r in details['_resolved']) < total
+
+
+class _CountingGraph(DependencyGraph):
+    """Dependency graph counting expanded nodes."""
+
+    expanded = 0
+
+    def children(self, node):
+        """Return direct dependencies of the node, count the expansion."""
+        _CountingGraph.expanded += 1
+        return super().children(node)
+
+
+@pytest.mark.parametrize("options", [{"max_nodes": 10}, {"timeout": 5}])
+def test_get_dependencies_limits_large_graph(options):
+    """Test that limits stop the walk of a large graph early."""
+    # Every module of a layer requires every module of the next layer.
+    lines = ['example.com/main example.com/l0m%d@v1.0.0' % i for i in range(20)]
+    lines.extend('example.com/l%dm%d@v1.0.0 example.com/l%dm%d@v1.0.0' % (layer, i, layer + 1, j)
+                 for layer in range(50) for i in range(20) for j in range(20))
+    manifests = [{"filename": "gograph.txt", "filepath": "/bin/local",
+                  "content": '\n'.join(lines)}]
+    _CountingGraph.expanded = 0
+    with patch("f8a_utils.base_tree_generator.time.time", side_effect=itertools.count()):
+        res = GolangDependencyTreeGenerator(graph_class=_CountingGraph).get_dependencies(
+            manifests, True, **options)
+    details = res['result'][0]['details'][0]
+    assert details['truncated'] is True
+    assert sum(len(r['deps']) for r in details['_resolved']) <= 10
+    # Full expansion would expand every one of 1000 nodes for each of 20 direct deps.
+    assert _CountingGraph.expanded < 100
+
+
+def test_walk_graph_depth_limit():
+    """Test that nodes first reached deep are expanded again when reached shallower."""
+    graph = DependencyGraph()
+    for parent, child in [('a', 'b'), ('b', 'c'), ('c', 'd'), ('a', 'c')]:
+        graph.add_edge(parent, child)
+    budget = ExpansionBudget(max_depth=2)
+    assert walk_graph(graph, 'a', budget) == ['b', 'c', 'd']
+    assert budget.truncated is False
+    budget = ExpansionBudget(max_depth=1)
+    assert walk_graph(graph, 'a', budget) == ['b', 'c']
+    assert budget.truncated is True
+
+
+def test_scan_and_find_dependencies_shared_nodes(ecosystem, filename, load_manifests):
+    """Test that manifests of one scan share one table of dependency nodes."""
+    manifests = load_manifests(filename, 3)
+    finder = DependencyFinder()
+    res = finder.scan_and_find_dependencies(ecosystem, manifests, True, shared_nodes=True)
+    single = finder.scan_and_find_dependencies(ecosystem, manifests[:1], True,
+                                               shared_nodes=True)
+    assert len(res['result']) == 1
+    assert len(res['result'][0]['nodes']) == len(single['result'][0]['nodes'])
+    expected = finder.scan_and_find_dependencies(ecosystem, manifests, True, compact=True)
+    expanded = expand_shared_nodes(res)['result'][0]['details']
+    for dep, expected_dep in zip(expanded, expected['result'][0]['details']):
+        assert dep['manifest_file_path'] == expected_dep['manifest_file_path']
+        for direct, expected_direct in zip(dep['_resolved'], expected_dep['_resolved']):
+            assert direct['package'] == expected_direct['package']
+            assert {(d['package'], d['version']) for d in direct['deps']} == \
+                {(d['package'], d['version']) for d in expected_direct['deps']}
+    with pytest.raises(ValueError):
+        finder.scan_and_find_dependencies(ecosystem, manifests, True, shared_nodes=True,
+                                          max_nodes=1)
+
+
+def test_ecosystem_registry():
+    """Test lazy import, reuse and registration of tree generators."""
+    code = ('import sys; import f8a_utils.dependency_finder as finder; '
+            'assert "f8a_utils.npm_tree_generator" not in sys.modules; '
+            'finder.get_tree_generator("npm"); '
+            'assert "f8a_utils.npm_tree_generator" in sys.modules; '
+            'assert "f8a_utils.maven_tree_generator" not in sys.modules')
+    subprocess.run([sys.executable, '-c', code], check=True)
+
+    assert get_tree_generator("maven") is get_tree_generator("maven")
+    assert isinstance(get_tree_generator("maven"), MavenDependencyTreeGenerator)
+    with pytest.raises(AssertionError):
+        get_dependency_tree_generator("cargo")
+
+    class CargoDependencyTreeGenerator(NpmDependencyTreeGenerator):
+        ecosystem = "cargo"
+
+    try:
+        register_ecosystem("cargo", CargoDependencyTreeGenerator)
+        res = DependencyFinder().scan_and_find_dependencies("cargo", [{
+            "filename": "Cargo.json", "filepath": "/bin/local",
+            "content": '{"dependencies": {"serde": {"version": "1.0.0"}}}'}], True)
+        assert res['result'][0]['details'][0]['ecosystem'] == "cargo"
+        register_ecosystem("cargo", "f8a_utils.tree_generator:PypiDependencyTreeGenerator")
+        assert get_dependency_tree_generator("cargo") is PypiDependencyTreeGenerator
+        assert isinstance(get_tree_generator("cargo"), PypiDependencyTreeGenerator)
+    finally:
+        dependency_finder._ECOSYSTEMS.pop("cargo")
+        dependency_finder._generator_classes.pop("cargo")
+        dependency_finder._generators.pop("cargo")
+
+
+def test_clean_versions():
+    """Test that batch of versions is cleaned like single versions, in order."""
+    versions = ['v2.1.4+incompatible', 'v32$@12', 'v2.1.4+incompatible', 'v0.20.1-beta']
+    assert DependencyFinder().clean_versions(iter(versions)) == \
+        [DependencyFinder().clean_version(version) for version in versions]
+    assert DependencyFinder().clean_versions([]) == []
+
+
+@pytest.mark.ecosystems("npm", "pypi")
+def test_scan_and_find_dependencies_streamed_json(ecosystem, filename):
+    """Test that JSON manifests parsed incrementally give the same results."""
+    path = Path(__file__).parent / filename
+    manifests = [{"filename": filename, "filepath": "/bin/local", "content": path.read_text()}]
+    expected = DependencyFinder().scan_and_find_dependencies(ecosystem, manifests, True)
+
+    for content, options in [(path, {}), (path.read_bytes(), {"stream": True}),
+                             (io.StringIO(path.read_text()), {}),
+                             (io.BytesIO(path.read_bytes()), {})]:
+        manifests[0]["content"] = content
+        res = DependencyFinder().scan_and_find_dependencies(
+            ecosystem, manifests, True, **options)
+        assert res == expected
+
+
+def test_json_stream():
+    """Test incremental JSON parsing with values split across chunks."""
+    documents = ['{"a": 12345, "b" : [1, {"c": "é"}, [], -0.25E-3], "d": {}, "f": 1.0}',
+                 '{"a": 1.5e10, "c": 12345}']
+    for data, size in itertools.product(documents, range(1, 12)):
+        stream = JsonStream(iter_text_chunks(io.BytesIO(data.encode()), size))
+        parsed = {}
+        for key in stream.items():
+            if key == 'b':
+                parsed[key] = [stream.value() for _ in stream.elements()]
+            else:
+                parsed[key] = stream.value()
+        assert parsed == json.loads(data)
+
+    for invalid in ('{"a": 1,}', '[1 2]', '{"a": 1'):
+        stream = JsonStream(iter_text_chunks(io.StringIO(invalid), 2))
+        with pytest.raises(ValueError):
+            for _ in stream.items() if invalid.startswith('{') else stream.elements():
+                stream.value()
+
+
+def test_json_stream_skip():
+    """Test that skipped values end where they should, across chunk boundaries."""
+    data = '{"a": {"b": ["]", "\\"{", {}], "c": -1.5}, "d": 2, "e": [[]], "f": "x"}'
+    for size in range(1, 12):
+        stream = JsonStream(iter_text_chunks(io.StringIO(data), size))
+        parsed = {}
+        for key in stream.items():
+            if key in ('a', 'e', 'f'):
+                stream.skip()
+            else:
+                parsed[key] = stream.value()
+        assert parsed == {"d": 2}
+
+    stream = JsonStream(iter_text_chunks(io.StringIO('{"a": [1, {"b": 2}'), 2))
+    with pytest.raises(ValueError):
+        for _ in stream.items():
+            stream.skip()
+
+
+@pytest.mark.parametrize("options", [
+    {"reverse_index": True},
+    {"reverse_index": True, "max_nodes": 1},
+])
+def test_scan_and_find_dependencies_npm_streamed_legacy_dependencies(options):
+    """Test that legacy dependencies of a lockfile don't leak into streamed results."""
+    packages = {
+        "": {"dependencies": {"xxx": "^1.0.0"}},
+        "node_modules/xxx": {"version": "1.0.0", "dependencies": {"zzz": "^1.0.0"}},
+        "node_modules/zzz": {"version": "1.0.0"},
+    }
+    legacy = {"xxx": {"version": "0.9.0", "dependencies": {"yyy": {"version": "1.0.0"}}}}
+    for document in ({"dependencies": legacy, "packages": packages},
+                     {"packages": packages, "dependencies": legacy}):
+        manifests = [{"filename": "package-lock.json", "filepath": "/bin/local",
+                      "content": json.dumps(document)}]
+        expected = DependencyFinder().scan_and_find_dependencies(
+            "npm", manifests, True, **options)
+        details = expected['result'][0]['details'][0]
+        assert "yyy" not in details['_reverse_index']
+        assert details['_resolved'][0]['version'] == "1.0.0"
+        res = DependencyFinder().scan_and_find_dependencies(
+            "npm", manifests, True, stream=True, **options)
+        assert res == expected
+
+
 if __name__ == '__main__':
     test_scan_and_find_dependencies_npm()
     test_scan_and_find_dependencies_npm_npm_list_as_bytes()
@@ -0,0 +1,166 @@
+"""Tests for classes from dependency_graph module."""
+
+import json
+import subprocess
+import sys
+
+import pytest
+
+from f8a_utils import dependency_graph
+from f8a_utils.dependency_finder import get_dependency_tree_generator
+from f8a_utils.dependency_graph import CSRDependencyGraph, DependencyGraph, SharedNodeTable
+
+
+def _graph(edges):
+    graph = DependencyGraph()
+    for parent, child in edges:
+        graph.add_edge(parent, child)
+    return graph
+
+
+def test_reachable_preorder():
+    """Test that reachable nodes are listed in depth first pre-order."""
+    graph = _graph([('a', 'b'), ('b', 'c'), ('a', 'd'), ('d', 'e')])
+    assert graph.reachable('a') == ('b', 'c', 'd', 'e')
+    assert graph.reachable('d') == ('e',)
+    assert graph.reachable('e') == ()
+    assert graph.reachable('unknown') == ()
+    assert graph.cycles == []
+
+
+def test_reachable_shared_subtree():
+    """Test that subtree shared by two nodes is reported for both of them."""
+    graph = _graph([('a', 'shared'), ('b', 'shared'), ('shared', 'x'), ('x', 'y'),
+                    ('a', 'x')])
+    assert graph.reachable('a') == ('shared', 'x', 'y')
+    assert graph.reachable('b') == ('shared', 'x', 'y')
+
+
+def test_reachable_cycles():
+    """Test that dependency cycles are detected and traversal terminates."""
+    graph = _graph([('a', 'b'), ('b', 'c'), ('c', 'b'), ('c', 'd'), ('e', 'e')])
+    assert graph.reachable('a') == ('b', 'c', 'd')
+    assert graph.reachable('b') == ('c', 'b', 'd')
+    assert graph.reachable('e') == ('e',)
+    assert sorted(sorted(cycle) for cycle in graph.cycles) == [['b', 'c'], ['e']]
+
+
+def test_add_edge_invalidates_closure():
+    """Test that memoized closures are dropped when the graph changes."""
+    graph = _graph([('a', 'b')])
+    assert graph.reachable('a') == ('b',)
+    graph.add_edge('b', 'c')
+    assert graph.reachable('a') == ('b', 'c')
+    assert 'b' in graph
+    assert 'c' not in graph
+    assert graph.children('a') == ['b']
+
+
+@pytest.fixture(params=['dict', 'csr', 'csr-without-numpy'])
+def graph_class(request, monkeypatch):
+    """Return graph implementation to test."""
+    if request.param == 'dict':
+        return DependencyGraph
+    if request.param == 'csr-without-numpy':
+        monkeypatch.setattr(dependency_graph, '_numpy', lambda: None)
+    return CSRDependencyGraph
+
+
+def test_graph_implementations_agree(graph_class):
+    """Test reachable sets, counts and depths of all the graph implementations."""
+    graph = graph_class()
+    for parent, child in [('a', 'b'), ('b', 'c'), ('c', 'b'), ('c', 'd'), ('a', 'd'),
+                          ('d', 'e'), ('f', 'f')]:
+        graph.add_edge(parent, child)
+    assert sorted(graph.reachable('a')) == ['b', 'c', 'd', 'e']
+    assert sorted(graph.reachable('b')) == ['b', 'c', 'd', 'e']
+    assert graph.reachable('e') == ()
+    assert graph.reachable('unknown') == ()
+    assert graph.reachable('f') == ('f',)
+    assert graph.transitive_count('a') == 4
+    assert graph.transitive_count('unknown') == 0
+    assert graph.depth('a') == 2
+    assert graph.depth('b') == 3
+    assert graph.depth('e') == 0
+    assert graph.depth('unknown') == 0
+    assert sorted(sorted(cycle) for cycle in graph.cycles) == [['b', 'c'], ['f']]
+    assert list(graph.children('a')) == ['b', 'd']
+    assert 'a' in graph
+    assert 'e' not in graph
+    graph.add_edge('e', 'g')
+    assert sorted(graph.reachable('a')) == ['b', 'c', 'd', 'e', 'g']
+
+
+def test_csr_graph_reachable_order():
+    """Test that CSR graph lists reachable nodes in order of their first appearance."""
+    graph = CSRDependencyGraph()
+    for parent, child in [('a', 'z'), ('a', 'b'), ('b', 'c'), ('z', 'y')]:
+        graph.add_edge(parent, child)
+    assert graph.reachable('a') == ('z', 'b', 'c', 'y')
+
+
+def test_csr_graph_imports_numpy_lazily():
+    """Test that NumPy is imported by CSR graph on first use only."""
+    code = ('import sys; from f8a_utils.dependency_finder import DependencyFinder; '
+            'DependencyFinder().scan_and_find_dependencies("maven", [{"filename": "x", '
+            '"filepath": "/x", "content": "digraph \\"a\\" {\\n}"}], True); '
+            'assert "numpy" not in sys.modules')
+    subprocess.run([sys.executable, '-c', code], check=True)
+
+
+@pytest.mark.ecosystems("maven", "golang", "npm")
+def test_tree_generators_with_csr_graph(ecosystem, filename, load_manifests):
+    """Test that CSR graph can be used underneath the tree generators."""
+    manifests = load_manifests(filename)
+    generator_class = get_dependency_tree_generator(ecosystem)
+    expected = generator_class().get_dependencies(manifests, True)
+    res = generator_class(graph_class=CSRDependencyGraph).get_dependencies(manifests, True)
+    expected_resolved = expected['result'][0]['details'][0]['_resolved']
+    resolved = res['result'][0]['details'][0]['_resolved']
+    assert [r['package'] for r in resolved] == [r['package'] for r in expected_resolved]
+    for direct, expected_direct in zip(resolved, expected_resolved):
+        assert sorted(json.dumps(d, sort_keys=True) for d in direct['deps']) == \
+            sorted(json.dumps(d, sort_keys=True) for d in expected_direct['deps'])
+
+
+def test_graph_parents(graph_class):
+    """Test parents of reachable nodes on their shortest paths."""
+    graph = graph_class()
+    for parent, child in [('a', 'b'), ('b', 'c'), ('c', 'a'), ('a', 'd'), ('d', 'c')]:
+        graph.add_edge(parent, child)
+    assert graph.parents('a') == {'b': 'a', 'd': 'a', 'c': 'b'}
+    assert graph.parents('c') == {'a': 'c', 'b': 'a', 'd': 'a'}
+    assert graph.parents('unknown') == {}
+
+
+def test_shared_node_table():
+    """Test that equal subgraphs and cycles of different graphs share their nodes."""
+    def add(table, edges, roots):
+        graph = _graph(edges)
+        return table.add(roots, graph.children,
+                         lambda node: {"package": node.rstrip("'"), "version": "1"})
+
+    table = SharedNodeTable()
+    first = add(table, [('a', 'b'), ('b', 'c'), ('c', 'b'), ('a', 'd')], ['a', 'd'])
+    assert len(table.nodes) == 4
+    assert add(table, [('a', 'b'), ('b', 'c'), ('c', 'b'), ('a', 'd')], ['a']) == first[:1]
+    # Different dependencies of the same package are not merged, equal subtrees are.
+    second = add(table, [("a'", 'd'), ('d', 'e')], ["a'", 'd'])
+    assert len(table.nodes) == 7
+    assert second[0] != first[0]
+    nodes = table.nodes
+    b = nodes[first[0]]['deps'][0]
+    c = nodes[b]['deps'][0]
+    assert (nodes[b]['package'], nodes[c]['package']) == ('b', 'c')
+    assert nodes[c]['deps'] == [b]
+    assert nodes[first[1]] == {"package": "d", "version": "1", "deps": []}
+
+
+def test_reachable_deep_chain():
+    """Test that deep acyclic chain is searched in linear time and memory."""
+    graph = _graph((i, i + 1) for i in range(100000))
+    assert graph.reachable(0) == tuple(range(1, 100001))
+    assert graph.transitive_count(50000) == 50000
+    # Only closures of the queried nodes are memoized.
+    assert len(graph._closure) == 2
+    assert graph.cycles == []
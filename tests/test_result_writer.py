@@ -0,0 +1,52 @@
+"""Test incremental JSON serialization of dependency tree results."""
+
+import io
+import json
+import socket
+
+from f8a_utils.cache_utils import TreeCache
+from f8a_utils.dependency_finder import DependencyFinder
+from f8a_utils.result_writer import write_result
+
+
+def test_scan_and_find_dependencies_sink(ecosystem, filename, load_manifests):
+    """Test that result written to the sink is the JSON of the compact result."""
+    manifests = load_manifests(filename, 3)
+    expected = DependencyFinder().scan_and_find_dependencies(
+        ecosystem, manifests, True, compact=True, reverse_index=True)
+    sink = io.BytesIO()
+    assert DependencyFinder().scan_and_find_dependencies(
+        ecosystem, manifests, True, reverse_index=True, sink=sink) == 3
+    assert sink.getvalue().decode('utf-8') == json.dumps(expected)
+
+    cache = TreeCache()
+    DependencyFinder().scan_and_find_dependencies(ecosystem, manifests, True, cache=cache)
+    sink = io.StringIO()
+    DependencyFinder().scan_and_find_dependencies(
+        ecosystem, manifests, True, cache=cache, lazy=True, sink=sink)
+    assert json.loads(sink.getvalue()) == json.loads(json.dumps(
+        DependencyFinder().scan_and_find_dependencies(ecosystem, manifests, True, compact=True)))
+
+
+def test_scan_and_find_dependencies_sink_shared_nodes(load_manifests):
+    """Test that table of shared nodes is written after the details."""
+    manifests = load_manifests("data/gograph.txt", 2)
+    expected = DependencyFinder().scan_and_find_dependencies(
+        "golang", manifests, True, shared_nodes=True)
+    sink = io.StringIO()
+    DependencyFinder().scan_and_find_dependencies(
+        "golang", manifests, True, shared_nodes=True, sink=sink)
+    assert sink.getvalue() == json.dumps(expected)
+
+
+def test_write_result_socket():
+    """Test writing the result in small pieces to a socket."""
+    details = [{"ecosystem": "pypi", "_resolved": [{"package": "é", "deps": []}] * 50},
+               {"ecosystem": "pypi", "_resolved": {"not": "list"}}]
+    expected = json.dumps({"result": [{"details": details}]})
+    reader, writer = socket.socketpair()
+    with reader, writer:
+        assert write_result(iter(details), writer, buffer_size=16) == 2
+        writer.shutdown(socket.SHUT_WR)
+        data = b''.join(iter(lambda: reader.recv(4096), b''))
+    assert data.decode('utf-8') == expected
@@ -0,0 +1,51 @@
+"""Test binary serialization of dependency tree results."""
+
+import json
+
+import pytest
+
+from f8a_utils.dependency_finder import DependencyFinder
+from f8a_utils.tree_codec import decode_result, encode_result
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_encode_result_round_trip(ecosystem, filename, compact, load_manifests):
+    """Test that encoded results decode into equal results of the same shape."""
+    res = DependencyFinder().scan_and_find_dependencies(
+        ecosystem, load_manifests(filename, 2), True, compact=compact, reverse_index=True,
+        max_nodes=50)
+    encoded = encode_result(res)
+    decoded = decode_result(encoded)
+    assert decoded == res
+    assert len(encoded) < len(json.dumps(res))
+    entries = decoded['result']
+    assert all(entry['details'] is entries[0]['details'] for entry in entries)
+
+
+def test_encode_result_lazy_and_irregular(load_manifests):
+    """Test lazy deps, directs without deps and resolved deps of unexpected structure."""
+    res = DependencyFinder().scan_and_find_dependencies(
+        "maven", load_manifests("data/dependencies.txt"), True, lazy=True)
+    details = res['result'][0]['details']
+    details.append({"ecosystem": "pypi", "_resolved": [{"package": "a", "version": "1"}]})
+    details.append({"ecosystem": "pypi",
+                    "_resolved": [{"package": "b", "deps": [{"nested": {"a": 1}}]}]})
+    details.append({"ecosystem": "pypi", "_resolved": {"not": "list"}})
+    details.append({"ecosystem": "pypi",
+                    "_resolved": [{"package": "c", "deps": [], "flag": True, "count": 1}]})
+    decoded = decode_result(encode_result(res))
+    assert json.loads(json.dumps(decoded)) == json.loads(json.dumps(res, default=list))
+    assert decoded['result'][0]['details'][-1]['_resolved'][0]['flag'] is True
+
+
+def test_encode_result_shared_nodes(load_manifests):
+    """Test round trip of result with table of shared nodes."""
+    res = DependencyFinder().scan_and_find_dependencies(
+        "golang", load_manifests("data/gograph.txt", 2), True, shared_nodes=True)
+    assert decode_result(encode_result(res)) == res
+
+
+def test_decode_result_invalid():
+    """Test that data not produced by encode_result are rejected."""
+    with pytest.raises(ValueError):
+        decode_result(b'{"result": []}' + b'\0' * 16)
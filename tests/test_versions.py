@@ -1,7 +1,17 @@
 """Test the code to retrieve package version from online sources."""
 
+import asyncio
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
 from unittest.mock import patch
 import pytest
+from aiohttp import web
 
 from f8a_utils.versions import (
     get_versions_for_npm_package,
@@ -11,9 +21,18 @@ from f8a_utils.versions import (
     get_latest_versions_for_ep,
     is_pkg_public,
     get_versions_and_latest_for_ep,
+    get_versions_and_latest_for_many,
     select_latest_version,
-    get_versions_for_golang_package
+    get_versions_for_golang_package,
+    configure_sessions,
+    get_session,
+    async_get_versions_and_latest_for_ep,
+    async_get_versions_for_ep,
+    async_get_latest_versions_for_ep,
+    close_async_session,
+    set_version_cache
 )
+from f8a_utils.cache_utils import MemoryCacheBackend, SqliteCacheBackend, VersionCache
 
 
 def test_is_pkg_public():
@@ -111,6 +130,7 @@ class _response_no_json:
     def __init__(self, status_code, text):
         self.status_code = status_code
         self.text = text
+        self.headers = {}
 
     def json(self):
         return None
@@ -122,24 +142,25 @@ class _response_json_value_error:
     def __init__(self, status_code, text):
         self.status_code = status_code
         self.text = text
+        self.headers = {}
 
     def json(self):
         raise ValueError(self.text)
 
 
-def mocked_requests_get_no_json(url):
+def mocked_requests_get_no_json(url, **_kwargs):
     """Implement mocked function requests.get()."""
     assert url
     return _response_no_json(200, """no JSON here""")
 
 
-def mocked_requests_get_value_error(url):
+def mocked_requests_get_value_error(url, **_kwargs):
     """Implement mocked function requests.get()."""
     assert url
     return _response_json_value_error(200, """no JSON here""")
 
 
-@patch("requests.get", side_effect=mocked_requests_get_no_json)
+@patch("requests.Session.get", side_effect=mocked_requests_get_no_json)
 def test_get_javascript_versions_empty_server_response(_mocked_get):
     """Test the behavior of function get_versions_for_npm_package for empty server response."""
     package_versions = get_versions_for_npm_package("array")
@@ -148,7 +169,7 @@ def test_get_javascript_versions_empty_server_response(_mocked_get):
     assert not package_versions
 
 
-@patch("requests.get", side_effect=mocked_requests_get_value_error)
+@patch("requests.Session.get", side_effect=mocked_requests_get_value_error)
 def test_get_javascript_versions_server_response_without_json(_mocked_get):
     """Test get_versions_for_npm_package for server response w/o proper JSON."""
     package_versions = get_versions_for_npm_package("array")
@@ -284,3 +305,318 @@ def test_select_vesion_empty():
     assert "" == select_latest_version()
 
     assert "" == select_latest_version([])
+
+
+@patch("requests.Session.get", side_effect=mocked_requests_get_no_json)
+def test_registry_sessions(mocked_get):
+    """Test that registry hosts have their own pooled sessions with timeouts."""
+    session = get_session("https://registry.npmjs.org/array")
+    assert get_session("https://registry.npmjs.org/lodash") is session
+    assert get_session("https://pypi.python.org/pypi/flask/json") is not session
+
+    try:
+        configure_sessions(pool_size=4, connect_timeout=1, read_timeout=2, keep_alive=False)
+        new_session = get_session("https://registry.npmjs.org/array")
+        assert new_session is not session
+        assert new_session.get_adapter("https://registry.npmjs.org/")._pool_maxsize == 4
+        assert new_session.headers['Connection'] == 'close'
+        get_versions_for_npm_package("array")
+        mocked_get.assert_called_once_with("https://registry.npmjs.org/array", timeout=(1, 2))
+    finally:
+        configure_sessions(pool_size=16, connect_timeout=3.05, read_timeout=30,
+                           keep_alive=True)
+
+
+def test_get_versions_and_latest_for_many():
+    """Test concurrent lookups limited per registry host, with per-package errors."""
+    lock = threading.Lock()
+    running = [0, 0]
+
+    def lookup(_ecosystem, package_name, _multi_source=False):
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        if package_name is None:
+            raise ValueError('Package name is not provided')
+        return {'versions': ['1.0.0'], 'latest_version': '1.0.0'}
+
+    packages = ['pkg{}'.format(i) for i in range(8)] + [None, 'pkg0']
+    try:
+        configure_sessions(host_concurrency=3)
+        with patch("f8a_utils.versions.get_versions_and_latest_for_ep", side_effect=lookup):
+            start = time.time()
+            res = get_versions_and_latest_for_many("npm", packages, max_concurrency=10)
+            assert time.time() - start < 0.05 * 8
+    finally:
+        configure_sessions(host_concurrency=8)
+    assert running[1] == 3
+    assert list(res) == packages[:-1]
+    assert res['pkg7'] == {'versions': ['1.0.0'], 'latest_version': '1.0.0'}
+    assert res[None] == {'error': 'Package name is not provided'}
+    assert get_versions_and_latest_for_many("npm", []) == {}
+
+    with pytest.raises(ValueError):
+        get_versions_and_latest_for_many("cobol", ["cds-parsers"])
+
+
+class _response_content:
+    """Mock the HTTP response with given payload."""
+
+    def __init__(self, status_code, content, headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def json(self):
+        return json.loads(self.content.decode('utf-8'))
+
+
+_MAVEN_METADATA = b"""<?xml version="1.0" encoding="UTF-8"?>
+<metadata><versioning><release>1.1</release>
+<versions><version>1.0</version><version>1.1</version></versions></versioning></metadata>"""
+
+
+def mocked_registries_get(url, **_kwargs):
+    """Implement mocked function requests.Session.get() for all the registries."""
+    if url == "https://registry.npmjs.org/array":
+        return _response_content(200, b'{"versions": {"1.0.0": {}}, "time": {"0.9.0": "",'
+                                      b' "modified": ""}, "dist-tags": {"latest": "1.0.0"}}')
+    if url == "https://registry.npmjs.org/broken":
+        return _response_content(200, b'no JSON here')
+    if url == "https://pypi.python.org/pypi/flask/json":
+        return _response_content(200, b'{"releases": {"1.0.2": []}, "info": {"version": "1.0.2"}}')
+    if url == "https://repo.maven.apache.org/maven2/junit/junit/maven-metadata.xml":
+        return _response_content(200, _MAVEN_METADATA)
+    return _response_content(404, b'')
+
+
+def _run(coroutine):
+    """Run the coroutine in a new event loop."""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.run_until_complete(close_async_session())
+        loop.close()
+
+
+@patch("f8a_utils.versions.aiohttp", None)
+@patch("requests.Session.get", side_effect=mocked_registries_get)
+def test_async_lookups(_mocked_get):
+    """Test asynchronous lookups of all the ecosystems."""
+    async def lookups():
+        return await asyncio.gather(
+            async_get_versions_and_latest_for_ep("npm", "array"),
+            async_get_versions_for_ep("npm", "broken"),
+            async_get_latest_versions_for_ep("pypi", "flask"),
+            async_get_versions_for_ep("pypi", "unknown"),
+            async_get_versions_and_latest_for_ep("maven", "junit:junit"),
+            async_get_versions_for_ep("maven", "there's missing colon"),
+            async_get_latest_versions_for_ep("maven", "abc:def"))
+
+    npm, npm_broken, pypi, pypi_unknown, maven, maven_invalid, maven_unknown = _run(lookups())
+    assert sorted(npm['versions']) == ['0.9.0', '1.0.0']
+    assert npm['latest_version'] == '1.0.0'
+    assert npm_broken == []
+    assert pypi == '1.0.2'
+    assert pypi_unknown == []
+    assert sorted(maven['versions']) == ['1.0', '1.1']
+    assert maven['latest_version'] == '1.1'
+    assert maven_invalid == []
+    assert maven_unknown == ''
+
+    with patch("f8a_utils.versions.get_versions_for_golang_package",
+               return_value=['1.0.0']) as mocked_golang:
+        assert _run(async_get_versions_for_ep("golang", "github.com/a/b")) == ['1.0.0']
+    mocked_golang.assert_called_once_with("github.com/a/b", False, False)
+
+    with pytest.raises(ValueError):
+        _run(async_get_versions_for_ep("cobol", "cds-parsers"))
+    with pytest.raises(ValueError):
+        _run(async_get_versions_for_ep("npm", None))
+
+
+def test_version_cache_revalidation():
+    """Test that stale versions are revalidated by conditional requests."""
+    responses = [_response_content(200, b'{"versions": {"1.0.0": {}}}', {'ETag': '"v1"'}),
+                 _response_content(304, b'', {'ETag': '"v1"'}),
+                 _response_content(200, b'{"versions": {"1.0.0": {}, "1.1.0": {}},'
+                                        b' "dist-tags": {"latest": "1.1.0"}}',
+                                   {'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT'}),
+                 _response_content(500, b''),
+                 _response_content(404, b'')]
+    cache = VersionCache(ttl={'npm': 0, 'pypi': 60})
+    previous = set_version_cache(cache)
+    try:
+        with patch("requests.Session.get", side_effect=responses) as mocked_get:
+            assert get_versions_for_npm_package("array") == ['1.0.0']
+            assert get_latest_versions_for_ep("npm", "array") == '1.0.0'
+            assert mocked_get.call_args[1]['headers'] == {'If-None-Match': '"v1"'}
+            assert sorted(get_versions_for_ep("npm", "array")) == ['1.0.0', '1.1.0']
+            assert mocked_get.call_args[1]['headers'] == {'If-None-Match': '"v1"'}
+            # Stale versions are used when the registry fails.
+            assert get_latest_versions_for_ep("npm", "array") == '1.1.0'
+            assert mocked_get.call_args[1]['headers'] == {
+                'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT'}
+            assert not is_pkg_public("pypi", "unknown")
+            # Fresh versions are not requested again.
+            assert not is_pkg_public("pypi", "unknown")
+            assert mocked_get.call_count == 5
+        assert cache.stats()['revalidations'] == 1
+
+        with patch("requests.Session.get", side_effect=mocked_registries_get) as mocked_get, \
+                patch("f8a_utils.versions.aiohttp", None):
+            assert _run(async_get_latest_versions_for_ep("pypi", "flask")) == '1.0.2'
+            assert get_versions_and_latest_for_ep("pypi", "flask") == {
+                'versions': ['1.0.2'], 'latest_version': '1.0.2'}
+            mocked_get.assert_called_once()
+    finally:
+        set_version_cache(previous)
+
+
+def test_version_cache_registry_outage():
+    """Test that failed Maven and Golang lookups are not cached, stale versions are used."""
+    cache = VersionCache(ttl={'maven': 0, 'golang': 0})
+    previous = set_version_cache(cache)
+    try:
+        with patch("f8a_utils.maven_utils.urlopen", side_effect=OSError) as mocked_urlopen:
+            assert not is_pkg_public("maven", "junit:junit")
+            assert get_versions_for_maven_package("junit:junit") == []
+            assert mocked_urlopen.call_count == 4
+        with patch("f8a_utils.maven_utils.urlopen",
+                   side_effect=[io.BytesIO(_MAVEN_METADATA), OSError]):
+            assert is_pkg_public("maven", "junit:junit")
+        with patch("f8a_utils.maven_utils.urlopen", side_effect=OSError) as mocked_urlopen:
+            assert get_latest_versions_for_ep("maven", "junit:junit") == '1.1'
+            assert mocked_urlopen.call_count == 2
+        with patch("f8a_utils.versions.aiohttp", None), \
+                patch("requests.Session.get", side_effect=OSError):
+            assert _run(async_get_latest_versions_for_ep("maven", "junit:junit")) == '1.1'
+
+        with patch("f8a_utils.versions.GolangUtils") as mocked_golang:
+            mocked_golang.return_value.get_all_versions.return_value = ['1.0.0']
+            mocked_golang.return_value.get_latest_version.return_value = '1.0.0'
+            assert get_versions_for_golang_package("github.com/a/b") == ['1.0.0']
+            mocked_golang.return_value.get_all_versions.return_value = None
+            mocked_golang.return_value.get_latest_version.return_value = None
+            assert get_versions_for_golang_package("github.com/a/b") == ['1.0.0']
+            assert get_versions_for_golang_package("github.com/c/d") is None
+            assert mocked_golang.call_count == 3
+        assert cache.get(cache.make_key('golang', 'github.com/c/d')) is None
+    finally:
+        set_version_cache(previous)
+
+
+def test_version_cache_async_backend():
+    """Test that asynchronous lookups don't access the cache backend in the event loop."""
+    threads = []
+
+    class Backend(MemoryCacheBackend):
+        def get(self, key):
+            threads.append(threading.get_ident())
+            return super().get(key)
+
+        def set(self, key, value):
+            threads.append(threading.get_ident())
+            return super().set(key, value)
+
+    previous = set_version_cache(VersionCache(Backend(), ttl={'pypi': 0}))
+    try:
+        with patch("requests.Session.get", side_effect=mocked_registries_get), \
+                patch("f8a_utils.versions.aiohttp", None):
+            assert _run(async_get_latest_versions_for_ep("pypi", "flask")) == '1.0.2'
+            assert _run(async_get_latest_versions_for_ep("pypi", "flask")) == '1.0.2'
+    finally:
+        set_version_cache(previous)
+    assert len(threads) == 4
+    assert threading.get_ident() not in threads
+
+
+def test_default_version_cache_unwritable(tmp_path):
+    """Test that versions are looked up without cache if its database can't be opened."""
+    path = str(tmp_path / 'missing' / 'versions.db')
+    script = 'from f8a_utils import versions; assert versions.set_version_cache(None) is None'
+    subprocess.run([sys.executable, '-c', script], check=True,
+                   env=dict(os.environ, VERSIONS_CACHE_PATH=path))
+
+
+def test_persistent_version_cache(tmp_path):
+    """Test that on-disk cache of versions is used by other processes."""
+    path = str(tmp_path / 'versions.db')
+    previous = set_version_cache(VersionCache(SqliteCacheBackend(path)))
+    try:
+        with patch("requests.Session.get", side_effect=mocked_registries_get):
+            assert is_pkg_public("npm", "array")
+            assert not is_pkg_public("pypi", "unknown")
+    finally:
+        set_version_cache(previous)
+
+    script = '\n'.join([
+        'from unittest.mock import patch',
+        'from f8a_utils.versions import get_latest_versions_for_ep, is_pkg_public',
+        'with patch("requests.Session.get", side_effect=AssertionError("not cached")):',
+        '    assert is_pkg_public("npm", "array")',
+        '    assert not is_pkg_public("pypi", "unknown")',
+        '    print(get_latest_versions_for_ep("npm", "array"))',
+    ])
+    output = subprocess.check_output([sys.executable, '-c', script],
+                                     env=dict(os.environ, VERSIONS_CACHE_PATH=path))
+    assert output.decode('utf-8').strip() == '1.0.0'
+
+
+def test_async_lookups_local_registry():
+    """Test asynchronous lookups against local registry, with revalidation and cancellation."""
+    requests_started = []
+    # Events of the slow request, created in the event loop running the lookups.
+    slow = {}
+
+    async def package(request):
+        requests_started.append(dict(request.headers))
+        if request.match_info['name'] == 'slow':
+            slow['started'].set()
+            await slow['released'].wait()
+        if request.headers.get('If-None-Match') == '"v1"':
+            return web.Response(status=304, headers={'ETag': '"v1"'})
+        return web.json_response({"versions": {"1.0.0": {}}, "dist-tags": {"latest": "1.0.0"}},
+                                 headers={'ETag': '"v1"'})
+
+    async def lookups():
+        slow.update(started=asyncio.Event(), released=asyncio.Event())
+        app = web.Application()
+        app.router.add_get('/{name}', package)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        site = web.SockSite(runner, sock)
+        await site.start()
+        url = 'http://127.0.0.1:{port}/{{pkg_name}}'.format(port=sock.getsockname()[1])
+        try:
+            with patch("f8a_utils.versions._NPM_PACKAGE_URL", url):
+                assert await async_get_versions_for_ep("npm", "array") == ['1.0.0']
+                assert await async_get_latest_versions_for_ep("npm", "array") == '1.0.0'
+                lookup = asyncio.ensure_future(async_get_versions_for_ep("npm", "slow"))
+                await asyncio.wait_for(slow['started'].wait(), 10)
+                lookup.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await lookup
+                # The session is still usable after the cancelled lookup.
+                assert await async_get_versions_for_ep("npm", "array") == ['1.0.0']
+        finally:
+            slow['released'].set()
+            await close_async_session()
+            await runner.cleanup()
+
+    cache = VersionCache(ttl={'npm': 0})
+    previous = set_version_cache(cache)
+    try:
+        _run(lookups())
+    finally:
+        set_version_cache(previous)
+    assert [headers.get('If-None-Match') for headers in requests_started] == [
+        None, '"v1"', None, '"v1"']
+    assert cache.stats()['revalidations'] == 2
+    assert cache.get(cache.make_key('npm', 'slow')) is None